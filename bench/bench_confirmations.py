@@ -0,0 +1,56 @@
+'''
+Per-reaction dispatch cost as pending confirmations go from 1 to 500:
+one `wait_for` check per pending confirmation (the old approach) against
+`ConfirmationRegistry.dispatch`. Run from the repo root:
+
+    python -m bench.bench_confirmations
+'''
+import asyncio
+import timeit
+from types import SimpleNamespace
+
+from bot.utils import ConfirmationRegistry
+
+EVENTS = 2000
+
+
+def old_listeners(pending):
+    # what `bot.wait_for('reaction_add', check=...)` leaves behind: one check per waiter, all run per event
+    listeners = []
+    for i in range(pending):
+        def check(reaction, user, confirm_user=i):
+            return user == confirm_user and reaction.emoji in ["✅", "❌"]
+        listeners.append(check)
+    return listeners
+
+
+async def main():
+    # an unrelated reaction somewhere in the guild: nobody is waiting for it
+    payload = SimpleNamespace(message_id=-1, user_id=-1, emoji="👍")
+    reaction = SimpleNamespace(emoji="👍")
+
+    print(f"{'pending':>8} {'wait_for checks':>16} {'registry':>10}")
+    for pending in (1, 10, 100, 500):
+        listeners = old_listeners(pending)
+        registry = ConfirmationRegistry()
+        for i in range(pending):
+            registry.register(i, i)
+
+        def old():
+            for check in listeners:
+                check(reaction, -1)
+
+        def new():
+            registry.dispatch(payload)
+
+        old_us = timeit.timeit(old, number=EVENTS) / EVENTS * 1e6
+        new_us = timeit.timeit(new, number=EVENTS) / EVENTS * 1e6
+        print(f"{pending:>8} {old_us:>13.2f} us {new_us:>7.2f} us")
+
+        for i in range(pending):
+            registry.discard(i)
+        assert len(registry) == 0
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
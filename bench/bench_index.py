@@ -0,0 +1,46 @@
+'''
+Compares a `discord.utils.get` scan against `GuildIndex` lookups for the
+name-collision checks in `/team`, at 2,000 channels. Run from the repo root:
+
+    python -m bench.bench_index
+'''
+import timeit
+from types import SimpleNamespace
+
+from discord.utils import get as dget
+
+from bot.index import GuildIndex
+
+CHANNELS = 2000
+ROLES = 500
+LOOKUPS = 2000
+
+
+def fake_guild():
+    channels = [SimpleNamespace(id=i, name=f"team-{i // 3}") for i in range(CHANNELS)]
+    roles = [SimpleNamespace(id=100000 + i, name=f"team-{i}") for i in range(ROLES)]
+    return SimpleNamespace(id=1, channels=channels, roles=roles)
+
+
+def main():
+    guild = fake_guild()
+    categories = []  # the fake channels aren't CategoryChannels; scan an empty list like the index does
+    index = GuildIndex(guild)
+    name = "not-a-team"  # worst case for the scan: no match
+
+    def scan():
+        return dget(guild.channels, name=name) or dget(categories, name=name) \
+            or dget(guild.channels, name=name) or dget(guild.roles, name=name)
+
+    def indexed():
+        return index.name_taken(name)
+
+    scan_s = timeit.timeit(scan, number=LOOKUPS) / LOOKUPS
+    index_s = timeit.timeit(indexed, number=LOOKUPS) / LOOKUPS
+    print(f"{CHANNELS} channels, {ROLES} roles")
+    print(f"scan:  {scan_s * 1e6:9.2f} us per collision check")
+    print(f"index: {index_s * 1e6:9.2f} us per collision check ({scan_s / index_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+'''
+Replays kickoff-style load against the real `bot.Bot`, talking to `bench.fake_discord`
+instead of Discord. Scenarios:
+
+- 500 ✅ reactions on the welcome message
+- 100 concurrent `/team` flows, each confirmed with ✅
+- `~judging_list` over 200 submissions
+- `~hitch` followed by `~clear` in a channel with 300 messages (some older than 14 days)
+- 100 more `/team` flows while a 1,000-grant reaction backlog drains; any interaction not
+  acknowledged within Discord's 3 seconds would have shown "interaction failed"
+
+For each it reports p50/p99 latency, REST calls per route, 429s, and the time lost to
+rate limits (retry_after handed out by the fake plus discord.py's own bucket waits).
+Run from the repo root:
+
+    python -m bench.bench_load [--quick]
+'''
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import discord
+import discord.http
+
+from bench.fake_discord import FakeDiscord
+
+BUCKET_WAITS = [0.0]
+
+
+def _track_bucket_waits():
+    '''Counts time discord.py spends sleeping on exhausted buckets before sending.'''
+    original = discord.http.Ratelimit._refresh
+
+    async def _refresh(self):
+        start = time.perf_counter()
+        try:
+            await original(self)
+        finally:
+            BUCKET_WAITS[0] += time.perf_counter() - start
+
+    discord.http.Ratelimit._refresh = _refresh
+
+
+def quantile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Report:
+    def __init__(self, fake: FakeDiscord) -> None:
+        self.fake = fake
+        self.rows = []
+
+    def begin(self) -> None:
+        self.fake.reset_stats()
+        BUCKET_WAITS[0] = 0.0
+        self.started = time.perf_counter()
+
+    def end(self, name: str, latencies: List[float], expected: int) -> None:
+        self.rows.append({
+            "name": name,
+            "done": len(latencies),
+            "expected": expected,
+            "wall": time.perf_counter() - self.started,
+            "p50": quantile(latencies, 0.5),
+            "p99": quantile(latencies, 0.99),
+            "calls": dict(self.fake.calls),
+            "429s": sum(self.fake.rate_limited.values()),
+            "retry_after": self.fake.retry_after_total,
+            "bucket_waits": BUCKET_WAITS[0],
+            "unknown": dict(self.fake.unknown),
+        })
+
+    def print(self) -> None:
+        for row in self.rows:
+            print(f"\n=== {row['name']}: {row['done']}/{row['expected']} done in {row['wall']:.2f}s")
+            print(f"latency p50 {row['p50'] * 1000:.0f} ms, p99 {row['p99'] * 1000:.0f} ms")
+            print(f"REST calls: {sum(row['calls'].values())}, 429s: {row['429s']}, "
+                  f"time lost to rate limits: {row['retry_after']:.2f}s in 429s + {row['bucket_waits']:.2f}s in bucket waits")
+            for route, count in sorted(row["calls"].items(), key=lambda item: -item[1]):
+                print(f"  {count:6d}  {route}")
+            for route, count in row["unknown"].items():
+                print(f"  unhandled route: {route} x{count}")
+
+
+def seed(fake: FakeDiscord, participants: int, reactors: int, backlog: int, old_messages: int, new_messages: int) -> Dict[str, object]:
+    everyone = fake.add_role("@everyone", role_id=fake.guild_id)
+    for name in ("participant", "mod", "organizer", "mentor", "volunteer", "sponsor", "judge"):
+        fake.add_role(name)
+    participant = fake.role_id("participant")
+
+    general = fake.add_channel("general", type=4)
+    for name in ("welcome", "team-create", "hitch", "judging-admin"):
+        fake.add_channel(name, parent_id=int(general["id"]))
+
+    fake.add_member("hacked-bot", user_id=fake.app_id, bot=True)
+    mod = fake.add_member("mod", roles=(fake.role_id("mod"), fake.role_id("organizer")))
+    team_members = [int(fake.add_member(f"hacker{i}", roles=(participant,))["user"]["id"]) for i in range(participants)]
+    reactor_ids = [int(fake.add_member(f"newcomer{i}")["user"]["id"]) for i in range(reactors)]
+    backlog_ids = [int(fake.add_member(f"latecomer{i}")["user"]["id"]) for i in range(backlog)]
+
+    hitch = fake.channel_id("hitch")
+    now = discord.utils.utcnow()
+    for i in range(old_messages):
+        fake.add_message(hitch, fake.bot_user, f"old {i}", when=now - datetime.timedelta(days=30, minutes=i))
+    for i in range(new_messages):
+        fake.add_message(hitch, fake.bot_user, f"recent {i}", when=now - datetime.timedelta(minutes=new_messages - i))
+
+    return {"mod": int(mod["user"]["id"]), "team_members": team_members, "reactors": reactor_ids, "backlog": backlog_ids, "everyone": everyone}
+
+
+async def scenario_reactions(bot, fake: FakeDiscord, report: Report, reactor_ids: List[int]) -> None:
+    welcome = fake.channel_id("welcome")
+    reacted_at: Dict[int, float] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    def listener(method, template, params, body, payload):
+        if template == "/guilds/{guild_id}/members/{user_id}/roles/{role_id}" and method == "PUT":
+            user_id = int(params["user_id"])
+            if user_id in reacted_at:
+                latencies.append(time.perf_counter() - reacted_at.pop(user_id))
+                if not reacted_at:
+                    done.set()
+
+    fake.listeners.append(listener)
+    report.begin()
+    for user_id in reactor_ids:
+        reacted_at[user_id] = time.perf_counter()
+        await fake.react(welcome, bot.config.get(fake.guild_id).welcome_message_id, user_id)
+    try:
+        await asyncio.wait_for(done.wait(), timeout=len(reactor_ids) + 60)
+    except asyncio.TimeoutError:
+        pass
+    report.end(f"{len(reactor_ids)} welcome reactions", latencies, len(reactor_ids))
+    fake.listeners.remove(listener)
+
+
+async def scenario_team(bot, fake: FakeDiscord, report: Report, member_ids: List[int], flows: int, prefix: str = "bench-team", label: str = "") -> None:
+    team_create = fake.channel_id("team-create")
+    started: Dict[str, float] = {}
+    acked: List[float] = []
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    def listener(method, template, params, body, payload):
+        if template == "/interactions/{interaction_id}/{token}/callback":
+            interaction = fake.interactions.get(params["token"])
+            name = interaction and interaction["data"]["options"][0]["value"]
+            if name in started:
+                acked.append(time.perf_counter() - started[name])
+        elif template == "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me" and params["emoji"] in ("❌", "%E2%9D%8C"):
+            # the bot has offered ✅/❌; confirm as the invoker
+            interaction = fake.message_interaction.get(int(params["message_id"]))
+            if interaction is not None:
+                user_id = int(interaction["member"]["user"]["id"])
+                asyncio.get_running_loop().create_task(fake.react(int(params["channel_id"]), int(params["message_id"]), user_id))
+        elif template == "/channels/{channel_id}/messages" and method == "POST":
+            channel = fake.channels.get(int(params["channel_id"]))
+            if channel and channel["name"] in started and (body or {}).get("content", "").startswith("Hey"):
+                latencies.append(time.perf_counter() - started.pop(channel["name"]))
+                if not started:
+                    done.set()
+
+    fake.listeners.append(listener)
+    report.begin()
+    for i in range(flows):
+        team = member_ids[i * 5:(i + 1) * 5]
+        name = f"{prefix}-{i}"
+        started[name] = time.perf_counter()
+        options = [{"name": "team_name", "type": 3, "value": name}]
+        options += [{"name": f"member{j + 1}", "type": 6, "value": member_id} for j, member_id in enumerate(team)]
+        await fake.slash(team_create, team[0], "team", options)
+    try:
+        await asyncio.wait_for(done.wait(), timeout=flows * 5 + 60)
+    except asyncio.TimeoutError:
+        pass
+    report.end(f"{flows} concurrent /team flows{label}", latencies, flows)
+    late = sum(1 for ack in acked if ack > 3.0)
+    report.rows[-1]["name"] += f" (ack p50 {quantile(acked, 0.5) * 1000:.0f} ms, p99 {quantile(acked, 0.99) * 1000:.0f} ms, {late} over 3s)"
+    fake.listeners.remove(listener)
+
+
+async def scenario_team_under_backlog(bot, fake: FakeDiscord, report: Report, member_ids: List[int], backlog_ids: List[int], flows: int) -> None:
+    welcome = fake.channel_id("welcome")
+    for user_id in backlog_ids:
+        await fake.react(welcome, bot.config.get(fake.guild_id).welcome_message_id, user_id)
+    await scenario_team(bot, fake, report, member_ids, flows, prefix="backlog-team", label=f" behind {len(backlog_ids)} queued grants")
+
+
+async def run_prefix(bot, fake: FakeDiscord, channel: str, mod_id: int, content: str) -> float:
+    name = content.split()[0].lstrip("~")
+
+    def check(ctx):
+        return ctx.command is not None and ctx.command.qualified_name == name
+
+    waiter = asyncio.ensure_future(bot.wait_for("command_completion", check=check, timeout=600))
+    start = time.perf_counter()
+    await fake.say(fake.channel_id(channel), mod_id, content)
+    await waiter
+    return time.perf_counter() - start
+
+
+async def scenario_judging_list(bot, fake: FakeDiscord, report: Report, mod_id: int, rows: int) -> None:
+    await bot.db.executemany(
+        "INSERT OR REPLACE INTO submissions (guild_id, team_name, devpost, github) VALUES (?, ?, ?, ?)",
+        [(fake.guild_id, f"bench-team-{i}", f"https://devpost.com/software/bench-team-{i}", f"https://github.com/bench/team-{i}") for i in range(rows)],
+    )
+    report.begin()
+    latency = await run_prefix(bot, fake, "judging-admin", mod_id, "~judging_list")
+    report.end(f"~judging_list with {rows} submissions", [latency], 1)
+
+
+async def scenario_hitch_clear(bot, fake: FakeDiscord, report: Report, mod_id: int) -> None:
+    messages = len(fake.messages[fake.channel_id("hitch")])
+    report.begin()
+    latency = await run_prefix(bot, fake, "hitch", mod_id, "~hitch")
+    report.end("~hitch", [latency], 1)
+
+    report.begin()
+    latency = await run_prefix(bot, fake, "hitch", mod_id, "~clear")
+    report.end(f"~clear over {messages} messages", [latency], 1)
+
+
+async def main(quick: bool) -> None:
+    scale = 10 if quick else 1
+    reactions, flows, rows, backlog = 500 // scale, 100 // scale, 200 // scale, 1000 // scale
+
+    logging.basicConfig(level=logging.ERROR)
+    _track_bucket_waits()
+
+    fake = FakeDiscord()
+    ids = seed(fake, participants=flows * 10, reactors=reactions, backlog=backlog, old_messages=50 // scale, new_messages=250 // scale)
+    await fake.start()
+    fake.install()
+
+    os.environ["TEAM_CREATION_ENABLED"] = "1"
+    os.environ.pop("WELCOME_CHANNEL_ID", None)
+
+    from bot.Bot import Bot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # judging.db lives in the working directory
+        try:
+            bot = Bot()
+            bot._connection.guild_ready_timeout = 0.1
+            runner = asyncio.create_task(bot.start("bench-token"))
+            await asyncio.wait_for(bot.wait_until_ready(), timeout=30)
+
+            report = Report(fake)
+            with contextlib.redirect_stdout(io.StringIO()):  # the bot prints a line per grant
+                await scenario_reactions(bot, fake, report, ids["reactors"])
+                await scenario_team(bot, fake, report, ids["team_members"], flows)
+                await scenario_judging_list(bot, fake, report, ids["mod"], rows)
+                await scenario_hitch_clear(bot, fake, report, ids["mod"])
+                await scenario_team_under_backlog(bot, fake, report, ids["team_members"][flows * 5:], ids["backlog"], flows)
+                await asyncio.sleep(1)  # let the last commands finish their bookkeeping
+            report.print()
+
+            await bot.close()
+            await asyncio.gather(runner, return_exceptions=True)
+        finally:
+            os.chdir(cwd)
+            await fake.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="run every scenario at a tenth of the size")
+    args = parser.parse_args()
+    asyncio.run(main(args.quick))
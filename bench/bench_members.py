@@ -0,0 +1,151 @@
+'''
+Compares the default configuration (every intent, every member cached, the guild chunked
+before ready) with `LEAN_MODE` on a synthetic 10,000-member guild served by
+`bench.fake_discord`. For each it reports:
+
+- time to ready, from `bot.start` to `wait_until_ready`
+- memory: resident set growth from just before the bot starts to ready, and after
+  `--reactions` ✅ reactions from members the bot hasn't seen have been granted the role
+- members cached, gateway member requests and REST member fetches made along the way
+
+Each mode runs in its own process so one doesn't inherit the other's heap. The fake sends
+member chunks as fast as it can unless `--chunk-delay` (seconds per 1,000-member chunk) is
+set closer to what the real gateway takes. Run from the repo root:
+
+    python -m bench.bench_members [--members 10000] [--reactions 100] [--chunk-delay 0.1]
+'''
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fake_discord import FakeDiscord
+
+
+def rss_mb() -> float:
+    '''Resident set size of this process (Linux).'''
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def seed(fake: FakeDiscord, members: int) -> list:
+    fake.add_role("@everyone", role_id=fake.guild_id)
+    for name in ("participant", "mod", "organizer", "mentor", "volunteer", "sponsor", "judge"):
+        fake.add_role(name)
+    general = fake.add_channel("general", type=4)
+    fake.add_channel("welcome", parent_id=int(general["id"]))
+    fake.add_member("hacked-bot", user_id=fake.app_id, bot=True)
+    participant = fake.role_id("participant")
+    # a tenth are already participants, like a server some way into registration
+    return [
+        int(fake.add_member(f"member{i}", roles=(participant,) if i % 10 == 0 else ())["user"]["id"])
+        for i in range(members)
+    ]
+
+
+async def run(mode: str, members: int, reactions: int, chunk_delay: float) -> dict:
+    logging.basicConfig(level=logging.ERROR)
+    fake = FakeDiscord()
+    member_ids = seed(fake, members)
+    fake.chunk_delay = chunk_delay
+    await fake.start()
+    fake.install()
+    os.environ.pop("WELCOME_CHANNEL_ID", None)
+
+    from bot.Bot import Bot
+
+    result = {"mode": mode}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # judging.db lives in the working directory
+        try:
+            gc.collect()
+            baseline = rss_mb()
+            start = time.perf_counter()
+            bot = Bot(lean=mode == "lean")
+            bot._connection.guild_ready_timeout = 0.1
+            runner = asyncio.create_task(bot.start("bench-token"))
+            await asyncio.wait_for(bot.wait_until_ready(), timeout=120)
+            result["ready_s"] = time.perf_counter() - start
+            gc.collect()
+            result["ready_mb"] = rss_mb() - baseline
+            result["cached_ready"] = len(bot.guilds[0].members)
+
+            # newcomers the bot hasn't looked up yet react on the welcome message
+            bot.role_grants.interval = 0  # measure the lookups, not the grant pacing
+            fake.reset_stats()
+            newcomers = [member_id for i, member_id in enumerate(member_ids) if i % 10][:reactions]
+            granted = asyncio.Event()
+            remaining = set(newcomers)
+
+            def listener(method, template, params, body, payload):
+                if template == "/guilds/{guild_id}/members/{user_id}/roles/{role_id}" and method == "PUT":
+                    remaining.discard(int(params["user_id"]))
+                    if not remaining:
+                        granted.set()
+
+            fake.listeners.append(listener)
+            welcome = fake.channel_id("welcome")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # the bot prints a line per grant
+                for member_id in newcomers:
+                    await fake.react(welcome, bot.config.get(fake.guild_id).welcome_message_id, member_id)
+                await asyncio.wait_for(granted.wait(), timeout=120)
+            result["grants_s"] = time.perf_counter() - start
+            gc.collect()
+            result["grants_mb"] = rss_mb() - baseline
+            result["cached_grants"] = len(bot.guilds[0].members)
+            result["member_requests"] = fake.member_requests
+            result["member_fetches"] = fake.calls["GET /guilds/{guild_id}/members/{user_id}"]
+
+            await bot.close()
+            await asyncio.gather(runner, return_exceptions=True)
+        finally:
+            os.chdir(cwd)
+            await fake.stop()
+    return result
+
+
+def main(members: int, reactions: int, chunk_delay: float) -> None:
+    results = []
+    for mode in ("full", "lean"):
+        out = subprocess.run(
+            [
+                sys.executable, "-m", "bench.bench_members", "--mode", mode,
+                "--members", str(members), "--reactions", str(reactions), "--chunk-delay", str(chunk_delay),
+            ],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{members} members, {reactions} reactions from uncached members")
+    print(f"{'mode':<6} {'ready':>8} {'RSS@ready':>10} {'cached':>7} {'grants':>8} {'RSS@grants':>11} {'cached':>7} {'op8':>5} {'GET member':>11}")
+    for r in results:
+        print(
+            f"{r['mode']:<6} {r['ready_s']:>7.2f}s {r['ready_mb']:>8.1f}MB {r['cached_ready']:>7} "
+            f"{r['grants_s']:>7.2f}s {r['grants_mb']:>9.1f}MB {r['cached_grants']:>7} {r['member_requests']:>5} {r['member_fetches']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--reactions", type=int, default=100)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--mode", choices=("full", "lean"), help=argparse.SUPPRESS)  # one run, in this process
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(asyncio.run(run(args.mode, args.members, args.reactions, args.chunk_delay))))
+    else:
+        main(args.members, args.reactions, args.chunk_delay)
@@ -0,0 +1,59 @@
+'''
+Writes 1,000 submissions concurrently through `Storage`, then reads them back, while a
+ticker task measures how late the event loop wakes up. `tests/test_storage.py` asserts
+the bound; this prints the numbers. Run from the repo root:
+
+    python -m bench.bench_storage
+'''
+import asyncio
+import os
+import tempfile
+import time
+
+from bot.storage import Storage
+
+SUBMISSIONS = 1000
+TICK = 0.001
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Storage(os.path.join(tmp, "judging.db"))
+        await db.start()
+        await db.execute("CREATE TABLE submissions (team_name TEXT PRIMARY KEY, devpost TEXT, github TEXT)")
+
+        stop = asyncio.Event()
+        lags = []
+        tick_task = asyncio.create_task(ticker(stop, lags))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            db.execute(
+                "INSERT OR REPLACE INTO submissions (team_name, devpost, github) VALUES (?, ?, ?)",
+                (f"team-{i}", f"https://devpost.com/{i}", f"https://github.com/{i}"),
+            )
+            for i in range(SUBMISSIONS)
+        ])
+        elapsed = time.perf_counter() - start
+
+        # keep sampling through the read-back, so the ticks cover more than the write burst
+        count = await db.fetchone("SELECT COUNT(*) FROM submissions")
+        rows = [row async for row in db.iterate("SELECT team_name, devpost, github FROM submissions")]
+        await asyncio.sleep(0.01)
+        stop.set()
+        await tick_task
+        await db.close()
+
+    print(f"wrote {count[0]} submissions in {elapsed * 1000:.1f} ms, read back {len(rows)}")
+    print(f"max loop stall: {max(lags) * 1000:.2f} ms over {len(lags)} ticks")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,625 @@
+'''
+A local stand-in for the Discord REST API and gateway, just big enough to run the real `bot.Bot`.
+
+It keeps one guild in memory, answers the routes the bot uses, pushes the matching
+gateway events (CHANNEL_CREATE, GUILD_ROLE_CREATE, GUILD_MEMBER_UPDATE, ...), and
+mimics Discord's rate limiting: per-route buckets with X-RateLimit-* headers, a global
+limit, 429 responses with `retry_after`, and a configurable latency per route.
+
+Point discord.py at it with `fake.install()` before constructing the bot.
+'''
+import asyncio
+import collections
+import datetime
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+import discord
+import discord.gateway
+import yarl
+
+DISCORD_EPOCH = 1420070400000
+
+# route -> (requests, per seconds); anything else gets DEFAULT_LIMIT.
+# These approximate what Discord hands out; tune them to match what production sees.
+ROUTE_LIMITS = {
+    ("POST", "/channels/{channel_id}/messages"): (5, 5.0),
+    ("PATCH", "/channels/{channel_id}/messages/{message_id}"): (5, 5.0),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}"): (5, 1.0),
+    ("POST", "/channels/{channel_id}/messages/bulk-delete"): (1, 1.0),
+    ("PUT", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me"): (1, 0.25),
+    ("PUT", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}"): (10, 1.0),
+    ("POST", "/guilds/{guild_id}/channels"): (5, 1.0),
+    ("POST", "/guilds/{guild_id}/roles"): (250, 172800.0),
+    ("PUT", "/channels/{channel_id}/permissions/{overwrite_id}"): (5, 1.0),
+}
+DEFAULT_LIMIT = (5, 1.0)
+GLOBAL_LIMIT = (50, 1.0)
+
+# route -> seconds of simulated server time; anything else gets DEFAULT_LATENCY
+ROUTE_LATENCY = {
+    ("POST", "/guilds/{guild_id}/channels"): 0.120,
+    ("POST", "/guilds/{guild_id}/roles"): 0.100,
+    ("POST", "/channels/{channel_id}/messages/bulk-delete"): 0.150,
+}
+DEFAULT_LATENCY = 0.040
+
+# routes that aren't counted against the bot's global limit
+GLOBAL_EXEMPT = {("POST", "/interactions/{interaction_id}/{token}/callback")}
+
+
+def iso(dt: datetime.datetime) -> str:
+    return dt.isoformat()
+
+
+def json_response(payload: Any, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    # discord.py only decodes bodies whose content-type is exactly application/json (no charset)
+    return web.Response(body=json.dumps(payload).encode(), status=status, headers={**(headers or {}), "Content-Type": "application/json"})
+
+
+class Bucket:
+    __slots__ = ("limit", "per", "remaining", "reset_at")
+
+    def __init__(self, limit: int, per: float) -> None:
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float) -> Optional[float]:
+        '''Consumes a request; returns None if allowed, else how long to wait.'''
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining <= 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return None
+
+
+class FakeDiscord:
+    def __init__(self, *, latency_jitter: float = 0.2, seed: int = 0) -> None:
+        self.latency_jitter = latency_jitter
+        self.random = random.Random(seed)
+        self._inc = 0
+
+        self.app_id = self.snowflake()
+        self.bot_user = self.user_payload(self.app_id, "hacked-bot", bot=True)
+        self.guild_id = self.snowflake()
+        self.roles: Dict[int, dict] = {}
+        self.channels: Dict[int, dict] = {}
+        self.members: Dict[int, dict] = {}
+        self.messages: Dict[int, "collections.OrderedDict[int, dict]"] = collections.defaultdict(collections.OrderedDict)
+        self.commands: List[dict] = []
+        self.interactions: Dict[str, dict] = {}  # token -> interaction payload
+        self.original: Dict[str, int] = {}  # token -> original response message id
+        self.message_interaction: Dict[int, dict] = {}  # message id -> interaction payload
+
+        self.routes: List[Tuple[str, "re.Pattern", str, Callable]] = []
+        self._add_routes()
+        self.buckets: Dict[Tuple, Bucket] = {}
+        self.global_bucket = Bucket(*GLOBAL_LIMIT)
+
+        # stats, reset between scenarios
+        self.calls: "collections.Counter[str]" = collections.Counter()
+        self.rate_limited: "collections.Counter[str]" = collections.Counter()
+        self.retry_after_total = 0.0
+        self.unknown: "collections.Counter[str]" = collections.Counter()
+        self.member_requests = 0  # gateway op 8
+        self.chunk_delay = 0.0  # seconds before each GUILD_MEMBERS_CHUNK
+
+        # hooks: called with (method, route, match, body) after a request is handled
+        self.listeners: List[Callable] = []
+
+        self.ws: Optional[web.WebSocketResponse] = None
+        self.seq = 0
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.member_count_override: Optional[int] = None
+
+    # ===== ids and payloads
+
+    def snowflake(self, when: Optional[datetime.datetime] = None) -> int:
+        self._inc += 1
+        ms = int((when.timestamp() if when else time.time()) * 1000)
+        return ((ms - DISCORD_EPOCH) << 22) | (self._inc & 0x3FFFFF)
+
+    def user_payload(self, user_id: int, name: str, bot: bool = False) -> dict:
+        return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": name, "avatar": None, "bot": bot}
+
+    def member_payload(self, member: dict) -> dict:
+        return {**member, "user": dict(member["user"]), "roles": list(member["roles"])}
+
+    def add_role(self, name: str, role_id: Optional[int] = None, **fields) -> dict:
+        role_id = role_id or self.snowflake()
+        role = {
+            "id": str(role_id), "name": name, "color": 0, "hoist": False, "position": len(self.roles),
+            "permissions": "0", "managed": False, "mentionable": False, "flags": 0, "icon": None, "unicode_emoji": None,
+        }
+        role.update(fields)
+        self.roles[role_id] = role
+        return role
+
+    def add_channel(self, name: str, type: int = 0, parent_id: Optional[int] = None, **fields) -> dict:
+        channel_id = self.snowflake()
+        channel = {
+            "id": str(channel_id), "type": type, "guild_id": str(self.guild_id), "name": name,
+            "position": len(self.channels), "permission_overwrites": [], "parent_id": str(parent_id) if parent_id else None,
+            "nsfw": False, "topic": None, "rate_limit_per_user": 0, "bitrate": 64000, "user_limit": 0,
+            "rtc_region": None, "last_message_id": None, "flags": 0,
+        }
+        channel.update(fields)
+        self.channels[channel_id] = channel
+        return channel
+
+    def add_member(self, name: str, roles: Tuple[int, ...] = (), user_id: Optional[int] = None, bot: bool = False) -> dict:
+        user_id = user_id or self.snowflake()
+        member = {
+            "user": self.user_payload(user_id, name, bot=bot), "roles": [str(r) for r in roles],
+            "joined_at": iso(discord.utils.utcnow()), "deaf": False, "mute": False, "flags": 0, "nick": None,
+            "avatar": None, "premium_since": None, "pending": False, "communication_disabled_until": None,
+        }
+        self.members[user_id] = member
+        return member
+
+    def add_message(self, channel_id: int, author: dict, content: str = "", when: Optional[datetime.datetime] = None, **fields) -> dict:
+        when = when or discord.utils.utcnow()
+        message_id = self.snowflake(when)
+        message = {
+            "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(self.guild_id), "author": author,
+            "content": content, "timestamp": iso(when), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0, "flags": 0, "components": [],
+        }
+        message.update(fields)
+        self.messages[channel_id][message_id] = message
+        return message
+
+    def role_id(self, name: str) -> int:
+        return next(int(r["id"]) for r in self.roles.values() if r["name"] == name)
+
+    def channel_id(self, name: str) -> int:
+        return next(int(c["id"]) for c in self.channels.values() if c["name"] == name)
+
+    def guild_payload(self) -> dict:
+        # like Discord, a large guild only sends our own member; the rest have to be requested (op 8)
+        large = len(self.members) > 250
+        members = [self.member_payload(m) for m in self.members.values() if not large or m["user"]["id"] == str(self.app_id)]
+        return {
+            "id": str(self.guild_id), "name": "HackED Bench", "icon": None, "splash": None, "discovery_splash": None,
+            "banner": None, "description": None, "owner_id": str(self.app_id), "afk_channel_id": None, "afk_timeout": 300,
+            "verification_level": 0, "default_message_notifications": 0, "explicit_content_filter": 0,
+            "roles": list(self.roles.values()), "emojis": [], "stickers": [], "features": [], "mfa_level": 0,
+            "system_channel_id": None, "system_channel_flags": 0, "rules_channel_id": None, "vanity_url_code": None,
+            "premium_tier": 0, "premium_subscription_count": 0, "preferred_locale": "en-US",
+            "public_updates_channel_id": None, "nsfw_level": 0, "premium_progress_bar_enabled": False,
+            "joined_at": iso(discord.utils.utcnow()), "large": large, "unavailable": False,
+            "member_count": self.member_count_override or len(self.members), "members": members,
+            "channels": list(self.channels.values()), "threads": [], "voice_states": [], "presences": [],
+            "stage_instances": [], "guild_scheduled_events": [], "max_members": 500000,
+        }
+
+    # ===== server lifecycle
+
+    def install(self) -> None:
+        '''Points discord.py's REST routes (including interaction webhooks) and gateway at this server.'''
+        discord.http.Route.BASE = f"http://127.0.0.1:{self.port}/api/v10"
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(f"ws://127.0.0.1:{self.port}/gateway")
+
+    async def start(self) -> int:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_get("/gateway", self._gateway)
+        app.router.add_route("*", "/api/v10/{path:.*}", self._rest)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+        self.rate_limited.clear()
+        self.unknown.clear()
+        self.retry_after_total = 0.0
+        self.member_requests = 0
+
+    # ===== gateway
+
+    async def dispatch(self, event: str, data: dict) -> None:
+        self.seq += 1
+        await self.ws.send_str(json.dumps({"op": 0, "t": event, "s": self.seq, "d": data}))
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.ws = ws
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": 41250}}))
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            op = payload["op"]
+            if op == 1:  # heartbeat
+                await ws.send_str(json.dumps({"op": 11}))
+            elif op == 2:  # identify
+                await self.dispatch("READY", {
+                    "v": 10, "user": self.bot_user, "guilds": [{"id": str(self.guild_id), "unavailable": True}],
+                    "session_id": "bench", "resume_gateway_url": f"ws://127.0.0.1:{self.port}/gateway",
+                    "application": {"id": str(self.app_id), "flags": 0}, "private_channels": [], "relationships": [],
+                    "shard": payload["d"].get("shard", [0, 1]),
+                })
+                await self.dispatch("GUILD_CREATE", self.guild_payload())
+            elif op == 8:  # request guild members
+                d = payload["d"]
+                self.member_requests += 1
+                if d.get("user_ids"):
+                    wanted = [int(u) for u in d["user_ids"]]
+                    members = [self.member_payload(self.members[u]) for u in wanted if u in self.members]
+                else:
+                    members = [self.member_payload(m) for m in self.members.values()]
+                chunks = [members[i:i + 1000] for i in range(0, len(members), 1000)] or [[]]
+                for index, chunk in enumerate(chunks):
+                    if self.chunk_delay:
+                        await asyncio.sleep(self.chunk_delay)
+                    await self.dispatch("GUILD_MEMBERS_CHUNK", {
+                        "guild_id": str(self.guild_id), "members": chunk, "chunk_index": index,
+                        "chunk_count": len(chunks), "nonce": d.get("nonce"),
+                        "not_found": [u for u in d.get("user_ids") or [] if int(u) not in self.members],
+                    })
+        self.ws = None
+        return ws
+
+    # ===== REST plumbing
+
+    def _add_routes(self) -> None:
+        table = [
+            ("GET", "/gateway", self.get_gateway),
+            ("GET", "/gateway/bot", self.get_gateway),
+            ("GET", "/users/@me", self.get_me),
+            ("GET", "/oauth2/applications/@me", self.get_application),
+            ("PUT", "/applications/{application_id}/commands", self.put_commands),
+            ("POST", "/interactions/{interaction_id}/{token}/callback", self.interaction_callback),
+            ("GET", "/webhooks/{application_id}/{token}/messages/@original", self.get_original),
+            ("PATCH", "/webhooks/{application_id}/{token}/messages/@original", self.edit_original),
+            ("POST", "/webhooks/{application_id}/{token}", self.followup),
+            ("POST", "/channels/{channel_id}/messages/bulk-delete", self.bulk_delete),
+            ("GET", "/channels/{channel_id}/messages", self.history),
+            ("POST", "/channels/{channel_id}/messages", self.create_message),
+            ("GET", "/channels/{channel_id}/messages/{message_id}", self.get_message),
+            ("PATCH", "/channels/{channel_id}/messages/{message_id}", self.edit_message),
+            ("DELETE", "/channels/{channel_id}/messages/{message_id}", self.delete_message),
+            ("PUT", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me", self.add_reaction),
+            ("GET", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}", self.get_reactions),
+            ("PUT", "/channels/{channel_id}/permissions/{overwrite_id}", self.edit_permissions),
+            ("DELETE", "/channels/{channel_id}", self.delete_channel),
+            ("POST", "/guilds/{guild_id}/channels", self.create_channel),
+            ("POST", "/guilds/{guild_id}/roles", self.create_role),
+            ("DELETE", "/guilds/{guild_id}/roles/{role_id}", self.delete_role),
+            ("GET", "/guilds/{guild_id}/members/{user_id}", self.get_member),
+            ("PUT", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self.add_member_role),
+            ("DELETE", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self.remove_member_role),
+        ]
+        for method, template, handler in table:
+            pattern = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template) + "$")
+            self.routes.append((method, pattern, template, handler))
+
+    def _match(self, method: str, path: str):
+        for route_method, pattern, template, handler in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match:
+                return template, handler, match.groupdict()
+        return None, None, None
+
+    def _bucket(self, method: str, template: str, params: dict) -> Tuple[Tuple, Bucket]:
+        major = params.get("channel_id") or params.get("guild_id") or params.get("token") or ""
+        key = (method, template, major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(*ROUTE_LIMITS.get((method, template), DEFAULT_LIMIT))
+        return key, bucket
+
+    async def _body(self, request: web.Request) -> Any:
+        if request.content_type.startswith("multipart/"):
+            body = {"attachments": []}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    body.update(json.loads(await part.text()))
+                else:
+                    data = await part.read()
+                    body["attachments"].append({"filename": part.filename, "size": len(data)})
+            return body
+        if request.can_read_body:
+            text = await request.text()
+            return json.loads(text) if text else None
+        return None
+
+    async def _rest(self, request: web.Request) -> web.Response:
+        path = "/" + request.match_info["path"]
+        method = request.method
+        template, handler, params = self._match(method, path)
+        if handler is None:
+            self.unknown[f"{method} {path}"] += 1
+            return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+        route = f"{method} {template}"
+        self.calls[route] += 1
+        now = time.monotonic()
+        bucket_key, bucket = self._bucket(method, template, params)
+        bucket_hash = str(abs(hash((method, template))))
+
+        wait = None
+        is_global = False
+        if (method, template) not in GLOBAL_EXEMPT:
+            wait = self.global_bucket.take(now)
+            is_global = wait is not None
+        if wait is None:
+            wait = bucket.take(now)
+
+        headers = {
+            "X-RateLimit-Limit": str(bucket.limit),
+            "X-RateLimit-Remaining": str(max(bucket.remaining, 0)),
+            "X-RateLimit-Reset": f"{time.time() + max(bucket.reset_at - now, 0):.3f}",
+            "X-RateLimit-Reset-After": f"{max(bucket.reset_at - now, 0):.3f}",
+            "X-RateLimit-Bucket": bucket_hash,
+            "Via": "1.1 google",
+        }
+        if wait is not None:
+            self.rate_limited[route] += 1
+            self.retry_after_total += wait
+            headers["X-RateLimit-Scope"] = "global" if is_global else "user"
+            if is_global:
+                headers["X-RateLimit-Global"] = "true"
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": round(wait, 3), "global": is_global},
+                status=429, headers=headers,
+            )
+
+        latency = ROUTE_LATENCY.get((method, template), DEFAULT_LATENCY)
+        await asyncio.sleep(latency * (1 + self.random.uniform(-self.latency_jitter, self.latency_jitter)))
+
+        body = await self._body(request)
+        status, payload = await handler(request, params, body)
+        for listener in list(self.listeners):
+            listener(method, template, params, body, payload)
+
+        if payload is None:
+            return web.Response(status=status, headers=headers)
+        return json_response(payload, status=status, headers=headers)
+
+    # ===== route handlers: (request, params, body) -> (status, payload)
+
+    async def get_gateway(self, request, params, body):
+        return 200, {"url": f"ws://127.0.0.1:{self.port}/gateway", "shards": 1,
+                     "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}}
+
+    async def get_me(self, request, params, body):
+        return 200, self.bot_user
+
+    async def get_application(self, request, params, body):
+        return 200, {"id": str(self.app_id), "name": "hacked-bot", "icon": None, "description": "", "bot_public": True,
+                     "bot_require_code_grant": False, "owner": self.bot_user, "verify_key": "", "flags": 0,
+                     "summary": "", "rpc_origins": []}
+
+    async def put_commands(self, request, params, body):
+        self.commands = [{**command, "id": str(self.snowflake()), "application_id": str(self.app_id), "version": "1"} for command in body]
+        return 200, self.commands
+
+    def _message_from_body(self, channel_id: int, body: dict, author: Optional[dict] = None) -> dict:
+        body = body or {}
+        return self.add_message(
+            channel_id, author or self.bot_user, body.get("content") or "",
+            embeds=body.get("embeds") or [], flags=body.get("flags") or 0,
+            attachments=[{"id": str(self.snowflake()), "filename": a["filename"], "size": a["size"], "url": "", "proxy_url": ""}
+                         for a in body.get("attachments", []) if "size" in a],
+        )
+
+    async def interaction_callback(self, request, params, body):
+        interaction = self.interactions.get(params["token"])
+        if interaction is not None and body.get("type") == 4:  # channel message with source
+            message = self._message_from_body(int(interaction["channel_id"]), body.get("data"))
+            self.original[params["token"]] = int(message["id"])
+            self.message_interaction[int(message["id"])] = interaction
+        return 204, None
+
+    async def get_original(self, request, params, body):
+        interaction = self.interactions.get(params["token"])
+        message_id = self.original.get(params["token"])
+        if interaction is None or message_id is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 200, self.messages[int(interaction["channel_id"])][message_id]
+
+    async def edit_original(self, request, params, body):
+        interaction = self.interactions.get(params["token"])
+        message_id = self.original.get(params["token"])
+        if interaction is None:
+            return 404, {"message": "Unknown Webhook", "code": 10015}
+        if message_id is None:  # deferred response being filled in
+            message = self._message_from_body(int(interaction["channel_id"]), body)
+            self.original[params["token"]] = int(message["id"])
+            self.message_interaction[int(message["id"])] = interaction
+            return 200, message
+        message = self.messages[int(interaction["channel_id"])][message_id]
+        message.update({k: v for k, v in (body or {}).items() if k in ("content", "embeds", "flags")})
+        return 200, message
+
+    async def followup(self, request, params, body):
+        interaction = self.interactions.get(params["token"])
+        if interaction is None:
+            return 404, {"message": "Unknown Webhook", "code": 10015}
+        message = self._message_from_body(int(interaction["channel_id"]), body)
+        self.message_interaction[int(message["id"])] = interaction
+        return 200, message
+
+    async def history(self, request, params, body):
+        channel_id = int(params["channel_id"])
+        query = request.query
+        limit = int(query.get("limit", 50))
+        before = int(query["before"]) if "before" in query else None
+        after = int(query["after"]) if "after" in query else None
+        ids = sorted(self.messages[channel_id])
+        if before is not None:
+            ids = [i for i in ids if i < before]
+        if after is not None:
+            ids = [i for i in ids if i > after]
+        ids = ids[:limit] if after is not None and before is None else ids[-limit:]
+        return 200, [self.messages[channel_id][i] for i in reversed(ids)]
+
+    async def create_message(self, request, params, body):
+        channel_id = int(params["channel_id"])
+        if channel_id not in self.channels:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        return 200, self._message_from_body(channel_id, body)
+
+    async def get_message(self, request, params, body):
+        message = self.messages[int(params["channel_id"])].get(int(params["message_id"]))
+        if message is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 200, message
+
+    async def edit_message(self, request, params, body):
+        message = self.messages[int(params["channel_id"])].get(int(params["message_id"]))
+        if message is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        message.update({k: v for k, v in (body or {}).items() if k in ("content", "embeds", "flags")})
+        message["edited_timestamp"] = iso(discord.utils.utcnow())
+        return 200, message
+
+    async def delete_message(self, request, params, body):
+        if self.messages[int(params["channel_id"])].pop(int(params["message_id"]), None) is None:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 204, None
+
+    async def bulk_delete(self, request, params, body):
+        channel = self.messages[int(params["channel_id"])]
+        cutoff = self.snowflake(discord.utils.utcnow() - datetime.timedelta(days=14))
+        ids = [int(i) for i in body["messages"]]
+        if not 2 <= len(ids) <= 100 or any(i < cutoff for i in ids):
+            return 400, {"message": "Invalid Form Body", "code": 50034}
+        for message_id in ids:
+            channel.pop(message_id, None)
+        return 204, None
+
+    async def add_reaction(self, request, params, body):
+        return 204, None
+
+    async def get_reactions(self, request, params, body):
+        return 200, []
+
+    async def edit_permissions(self, request, params, body):
+        channel = self.channels.get(int(params["channel_id"]))
+        if channel is None:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        overwrites = [o for o in channel["permission_overwrites"] if o["id"] != params["overwrite_id"]]
+        overwrites.append({"id": params["overwrite_id"], **body})
+        channel["permission_overwrites"] = overwrites
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return 204, None
+
+    async def create_channel(self, request, params, body):
+        channel = self.add_channel(
+            body["name"], type=body.get("type", 0), parent_id=body.get("parent_id"),
+            permission_overwrites=[{**o, "id": str(o["id"])} for o in body.get("permission_overwrites", [])],
+        )
+        await self.dispatch("CHANNEL_CREATE", channel)
+        return 201, channel
+
+    async def delete_channel(self, request, params, body):
+        channel = self.channels.pop(int(params["channel_id"]), None)
+        if channel is None:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        await self.dispatch("CHANNEL_DELETE", channel)
+        return 200, channel
+
+    async def create_role(self, request, params, body):
+        role = self.add_role(body.get("name", "new role"), color=body.get("color", 0), mentionable=body.get("mentionable", False))
+        await self.dispatch("GUILD_ROLE_CREATE", {"guild_id": str(self.guild_id), "role": role})
+        return 200, role
+
+    async def delete_role(self, request, params, body):
+        role_id = int(params["role_id"])
+        if self.roles.pop(role_id, None) is None:
+            return 404, {"message": "Unknown Role", "code": 10011}
+        await self.dispatch("GUILD_ROLE_DELETE", {"guild_id": str(self.guild_id), "role_id": str(role_id)})
+        return 204, None
+
+    async def get_member(self, request, params, body):
+        member = self.members.get(int(params["user_id"]))
+        if member is None:
+            return 404, {"message": "Unknown Member", "code": 10007}
+        return 200, self.member_payload(member)
+
+    async def _member_roles(self, params, add: bool):
+        member = self.members.get(int(params["user_id"]))
+        if member is None:
+            return 404, {"message": "Unknown Member", "code": 10007}
+        roles = [r for r in member["roles"] if r != params["role_id"]]
+        if add:
+            roles.append(params["role_id"])
+        member["roles"] = roles
+        await self.dispatch("GUILD_MEMBER_UPDATE", {"guild_id": str(self.guild_id), **self.member_payload(member)})
+        return 204, None
+
+    async def add_member_role(self, request, params, body):
+        return await self._member_roles(params, add=True)
+
+    async def remove_member_role(self, request, params, body):
+        return await self._member_roles(params, add=False)
+
+    # ===== helpers for scenarios
+
+    async def react(self, channel_id: int, message_id: int, user_id: int, emoji: str = "✅") -> None:
+        member = self.members.get(user_id)
+        data = {
+            "user_id": str(user_id), "channel_id": str(channel_id), "message_id": str(message_id),
+            "guild_id": str(self.guild_id), "emoji": {"id": None, "name": emoji}, "burst": False, "type": 0,
+        }
+        if member is not None:
+            data["member"] = self.member_payload(member)
+        await self.dispatch("MESSAGE_REACTION_ADD", data)
+
+    async def say(self, channel_id: int, user_id: int, content: str) -> dict:
+        member = self.members[user_id]
+        message = self.add_message(channel_id, member["user"], content)
+        member_data = {k: v for k, v in self.member_payload(member).items() if k != "user"}
+        await self.dispatch("MESSAGE_CREATE", {**message, "member": member_data})
+        return message
+
+    async def slash(self, channel_id: int, user_id: int, name: str, options: List[dict]) -> dict:
+        '''Invokes a synced slash command. Options of type 6 (user) are resolved to members.'''
+        command = next(c for c in self.commands if c["name"] == name)
+        member = self.members[user_id]
+        resolved_users, resolved_members = {}, {}
+        for option in options:
+            if option["type"] == 6:
+                target = self.members[int(option["value"])]
+                resolved_users[option["value"]] = target["user"]
+                resolved_members[option["value"]] = {k: v for k, v in self.member_payload(target).items() if k != "user"}
+        interaction = {
+            "id": str(self.snowflake()), "application_id": str(self.app_id), "type": 2,
+            "token": f"token-{self.snowflake()}", "version": 1, "guild_id": str(self.guild_id),
+            "channel_id": str(channel_id), "channel": self.channels[channel_id],
+            "member": {**self.member_payload(member), "permissions": "8"}, "locale": "en-US", "guild_locale": "en-US",
+            "app_permissions": "8", "entitlements": [], "authorizing_integration_owners": {}, "context": 0,
+            "data": {
+                "id": command["id"], "name": name, "type": 1, "options": [{k: str(v) if k == "value" else v for k, v in o.items()} for o in options],
+                "resolved": {"users": resolved_users, "members": resolved_members},
+            },
+        }
+        self.interactions[interaction["token"]] = interaction
+        await self.dispatch("INTERACTION_CREATE", interaction)
+        return interaction
@@ -11,68 +11,301 @@ from discord import app_commands
 import logging
 from discord.utils import get as dget
 import os
-from .utils import get_confirmation
-import sqlite3
-
-class Bot(commands.Bot):
-    def __init__(self, command_prefix="~") -> None:
-        super().__init__(command_prefix=command_prefix, intents=discord.Intents.all())
-        self.conn = sqlite3.connect('judging.db')
-        self.cursor = self.conn.cursor()
-        self.message_id = 1336237048696275007  # The ID of the message to watch for reactions
-        self.role_to_add = None  # The role to assign when reacted to
+import time
+import asyncio
+from .utils import ConfirmationRegistry, get_confirmation, respond
+from .storage import Storage
+from .provision import provision_team
+from .index import NameIndex
+from .teams import TeamRegistry
+from .render import EMBED_FIELD_LIMIT, clip, export_file, send_embeds, send_text
+from .reactions import RoleGrantWorker
+from .sync import SCHEMA as STATE_SCHEMA, sync_if_changed
+from .guide import SCHEMA as GUIDE_SCHEMA, Guide
+from .purge import PurgeJob
+from .metrics import Metrics
+from .config import ConfigCache
+from .judging import claim_legacy, migrate as migrate_submissions
+from .members import MemberFetcher, lean_intents
+from .journal import SCHEMA as JOURNAL_SCHEMA, Journal, reconcile, roll_back
+from .roster import SCHEMA as ROSTER_SCHEMA, RosterImport, parse_roster, validate_roster
+from .scheduler import BULK, CLASS_NAMES, PROVISION, RestScheduler, priority
+
+# Interactions must be answered within 3 seconds; defer any that haven't been by this point
+AUTO_DEFER_AFTER = 2.0
+
+def is_mod():
+    '''Like `commands.has_role`, with the guild's configured mod role.'''
+    async def predicate(ctx: commands.Context) -> bool:
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        return await commands.has_role(ctx.bot.config.get(ctx.guild.id).mod_role).predicate(ctx)
+    return commands.check(predicate)
+
+
+class ClearFlags(commands.FlagConverter):
+    author: Optional[discord.Member] = None
+    before: Optional[discord.Object] = None
+    after: Optional[discord.Object] = None
+    keep_pinned: bool = False
+
+
+class BotTree(CommandTree):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._defers = set()  # running auto_defer tasks
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started"] = time.perf_counter()
+        delay = max((discord.utils.utcnow() - interaction.created_at).total_seconds(), 0.0)
+        self.client.metrics.interaction_delay.observe(delay)
+
+        # A fixed deadline, less however late the interaction reached us. Interaction responses
+        # go through the webhook adapter, not the REST scheduler, so its queue can't predict them.
+        remaining = AUTO_DEFER_AFTER - delay
+        if remaining <= 0:
+            await self.auto_defer(interaction)
+        else:
+            interaction.extras["defer_timer"] = asyncio.get_running_loop().call_later(remaining, self._start_defer, interaction)
+        return True
+
+    def _start_defer(self, interaction: discord.Interaction) -> None:
+        task = asyncio.create_task(self.auto_defer(interaction))
+        self._defers.add(task)
+        task.add_done_callback(self._defers.discard)
+
+    @staticmethod
+    def cancel_defer(interaction: discord.Interaction) -> None:
+        timer = interaction.extras.pop("defer_timer", None)
+        if timer is not None:
+            timer.cancel()
+
+    async def auto_defer(self, interaction: discord.Interaction) -> None:
+        if interaction.response.is_done():
+            return
+        try:
+            await interaction.response.defer()
+            logging.info(f"deferred /{interaction.command.qualified_name if interaction.command else '?'} to keep it from timing out")
+        except (discord.InteractionResponded, discord.HTTPException):
+            pass  # the command answered first
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        self.cancel_defer(interaction)
+        self.client.observe_command("slash", interaction.command, interaction.extras, "error")
+        await super().on_error(interaction, error)
+
+
+class Bot(commands.AutoShardedBot):
+    def __init__(self, command_prefix="~", shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None, lean: bool = False) -> None:
+        # every shard gets its own gateway connection; shard_ids splits them across processes
+        self.metrics = Metrics()
+        if lean:
+            # no presences, no startup chunking; only members we look up (participants, team members) are cached
+            cache = dict(intents=lean_intents(), member_cache_flags=discord.MemberCacheFlags.none(), chunk_guilds_at_startup=False)
+        else:
+            cache = dict(intents=discord.Intents.all())
+        super().__init__(
+            command_prefix=command_prefix, tree_cls=BotTree, http_trace=self.metrics.trace_config(),
+            shard_count=shard_count, shard_ids=shard_ids, **cache,
+        )
+        self.lean = lean
+        self.rest = RestScheduler()  # REST calls by priority: replies, then provisioning, then bulk work
+        self.http.request = self.rest.wrap(self.http.request)
+        self.db = Storage('judging.db')
+        self.names = NameIndex()  # name -> channel/category/role, per guild
+        self.teams = TeamRegistry(self.db)  # member -> team and team -> members
+        self.journal = Journal(self.db)  # provisioning in flight, for crash recovery
+        self.config = ConfigCache(self.db)  # per-guild settings: welcome message, role & channel names, toggles
+        self.members = MemberFetcher()  # batched lookups of members that aren't cached
+        self.role_grants = RoleGrantWorker(self, self.participant_role, members=self.members)
+        self.guide = Guide(self.db)  # the `hitch` embeds, from guide.json
+        self.purges = {}  # channel id -> running `clear` task
+        self.imports = {}  # guild id -> running `import_teams` task (None while one awaits confirmation)
+        self.confirmations = ConfirmationRegistry()  # pending ✅/❌ confirmations, by message id
         self.add_commands()
         self.team_list = None
+        self.started_at = time.perf_counter()
+        self.startup_timings = {}  # step -> seconds: db_init, sync, ready
     
-    async def on_ready(self):
-        print(f'{self.user} has connected to {self.guilds[0].name}!')
-        
-        # Add slash commands
+    async def setup_hook(self):
+        # Runs once per process, before connecting to the gateway
+        start = time.perf_counter()
+
+        await self.db.start()
+        await self.db.executescript(STATE_SCHEMA)
+        await self.db.executescript(GUIDE_SCHEMA)
+        await self.db.executescript(ROSTER_SCHEMA)
+        await self.db.executescript(JOURNAL_SCHEMA)
+        await self.teams.load()
+        await migrate_submissions(self.db)  # keyed by (guild, team name)
+        await self.config.load()
+        self.guide.load()
+        self.startup_timings["db_init"] = time.perf_counter() - start
+        print(f"Database has been setup")
+
+        # Add slash commands, only if they changed since the last sync
+        start = time.perf_counter()
         try:
-            synced = await self.tree.sync()
-            print(f"Synced {len(synced)} command(s)")
+            synced = await sync_if_changed(self.tree, self.db, self.application_id)
+            if synced is None:
+                print("Command tree unchanged; skipped sync")
+            else:
+                print(f"Synced {synced} command(s)")
         except Exception as e:
             print(e)
+        self.startup_timings["sync"] = time.perf_counter() - start
+
+        self.role_grants.start()
+
+        # Metrics: served on 127.0.0.1:METRICS_PORT if set
+        self.db.observe = lambda kind, seconds: self.metrics.db_latency.observe(seconds, kind)
+        self.metrics.gauge("hackedbot_gateway_latency_seconds", "Gateway heartbeat latency.", lambda: self.latency)
+        self.metrics.gauge("hackedbot_role_grant_queue_depth", "Reaction role grants waiting.", lambda: self.role_grants.depth)
+        self.metrics.gauge("hackedbot_db_write_queue_depth", "Writes waiting for the SQLite writer.", lambda: self.db.pending_writes)
+        self.metrics.gauge("hackedbot_pending_confirmations", "Confirmations waiting for a reaction.", lambda: len(self.confirmations))
+        self.metrics.gauge("hackedbot_running_purges", "`clear` purges in progress.", lambda: len(self.purges))
+        self.metrics.gauge("hackedbot_running_imports", "`import_teams` imports in progress.", lambda: sum(task is not None for task in self.imports.values()))
+        self.metrics.gauge("hackedbot_cached_members", "Members held in the member cache.", lambda: sum(len(guild.members) for guild in self.guilds))
+        self.metrics.gauge("hackedbot_member_lookups", "Gateway member requests made for uncached members.", lambda: self.members.requests)
+        self.metrics.gauge("hackedbot_rest_in_flight", "Discord REST requests in flight.", lambda: self.rest.in_flight)
+        for cls, name in CLASS_NAMES.items():
+            if cls in self.rest.weights:
+                self.metrics.gauge(f"hackedbot_rest_queue_{name}", f"Discord REST requests waiting ({name}).", lambda cls=cls: self.rest.depth(cls))
+        await self.metrics.start(int(os.getenv("METRICS_PORT") or 0) or None)
+
+    async def on_ready(self):
+        # on_ready fires again on every gateway reconnect, so only do the startup work once
+        if self.startup_timings.get("ready") is not None:
+            print(f"{self.user} reconnected")
+            return
+        self.startup_timings["ready"] = time.perf_counter() - self.started_at
 
-        # Add reaction message to get participant assigned
         for guild in self.guilds:
-            if guild.name == os.getenv("DISCORD_GUILD"):
-                break
-        self.role_to_add = discord.utils.get(guild.roles, name="participant")  # Get the role
+            print(f'{self.user} has connected to {guild.name}!')
+            config = self.config.get(guild.id)
+            role = self.participant_role(guild)
+            if role:
+                print(f"Reaction role set! Role `{role.name}` will be added when users react to message ID `{config.welcome_message_id}`.")
+            else:
+                print(f"Role `{config.participant_role}` not found in {guild.name}. Please check the role name (`~config participant_role <name>`).")
+
+        # Finish or roll back any team that was half-created when we last stopped
+        finished, rolled_back = await reconcile(self.journal, self, self.teams, self.names, lambda guild: self.config.get(guild.id).staff_roles, self.members)
+        if finished or rolled_back:
+            print(f"Recovered interrupted team creation: {finished} finished, {rolled_back} rolled back")
+
+        # Submissions from the single-guild days belong to DISCORD_GUILD (or the only guild, if unsharded)
+        legacy_guild = os.getenv("DISCORD_GUILD")
+        if legacy_guild:
+            legacy_guild = dget(self.guilds, name=legacy_guild)
+        elif len(self.guilds) == 1 and (self.shard_count or 1) == 1:
+            legacy_guild = self.guilds[0]
+        if legacy_guild:
+            moved = await claim_legacy(self.db, legacy_guild.id)
+            if moved:
+                print(f"Assigned {moved} submission(s) from before multi-server support to {legacy_guild.name}")
+
+        # Carry on with any `import_teams` that was interrupted; its progress is in provision_jobs
+        for guild in self.guilds:
+            if guild.id not in self.imports and await RosterImport.unfinished(self.db, guild.id):
+                job = RosterImport(guild, self.db, self.teams, self.names.get(guild), staff_roles=self.config.get(guild.id).staff_roles, members=self.members)
+                self.start_import(job)
+                print(f"Resuming an interrupted team import in {guild.name}")
 
-        if self.role_to_add:
-            print(f"Reaction role set! Role `{self.role_to_add.name}` will be added when users react to message ID `{self.message_id}`.")
-        else:
-            print(f"Role `participant` not found. Please check the role name.")
-
-        # Make `channel_name` the primary key
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS submissions (
-            team_name TEXT PRIMARY KEY,
-            devpost TEXT,
-            github TEXT
-        )
-        """)
-        self.conn.commit()
-        print(f"Database has been setup")
+        timings = self.startup_timings
+        print(f"Startup: ready in {timings['ready']:.2f}s (db init {timings.get('db_init', 0):.2f}s, command sync {timings.get('sync', 0):.2f}s)")
+
+        # Grant the role to anyone who reacted while we were offline
+        for guild in self.guilds:
+            config = self.config.get(guild.id)
+            channel = guild.get_channel(config.welcome_channel_id)
+            if channel and self.participant_role(guild):
+                with priority(BULK):
+                    queued = await self.role_grants.backfill(channel, config.welcome_message_id)
+                print(f"Queued {queued} missed reaction role grant(s) in {guild.name}")
+
+    def start_import(self, job: RosterImport) -> asyncio.Task:
+        '''Runs an import in the background, one per guild, tracked in `self.imports`.'''
+        task = asyncio.create_task(job.run(), name=f"import-teams-{job.guild.id}")
+        self.imports[job.guild.id] = task
+        task.add_done_callback(lambda _: self.imports.pop(job.guild.id, None))
+        return task
+
+    def participant_role(self, guild: discord.Guild) -> Optional[discord.Role]:
+        '''The role to assign when someone reacts to the guild's welcome message.'''
+        return self.names.get(guild).role(self.config.get(guild.id).participant_role)
+
+    # ===== keep the name index current
+
+    async def on_guild_available(self, guild: discord.Guild):
+        self.names.build(guild)
+
+    async def on_guild_join(self, guild: discord.Guild):
+        self.names.build(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.names.drop(guild)
+
+    async def on_guild_channel_create(self, channel):
+        self.names.channel_created(channel)
+
+    async def on_guild_channel_delete(self, channel):
+        self.names.channel_deleted(channel)
+
+    async def on_guild_channel_update(self, before, after):
+        self.names.channel_updated(before, after)
+
+    async def on_guild_role_create(self, role: discord.Role):
+        self.names.role_created(role)
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.names.role_deleted(role)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self.names.role_updated(before, after)
+
+    # ===== command metrics
+
+    def observe_command(self, kind: str, command, extras: dict, outcome: str) -> None:
+        started = extras.get("started")
+        if started is None or command is None:
+            return
+        self.metrics.command_latency.observe(time.perf_counter() - started, kind, command.qualified_name, outcome)
+
+    async def on_command(self, ctx: commands.Context):
+        ctx.extras = {"started": time.perf_counter()}
+
+    async def on_command_completion(self, ctx: commands.Context):
+        self.observe_command("prefix", ctx.command, getattr(ctx, "extras", {}), "ok")
+
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
+        self.observe_command("prefix", ctx.command, getattr(ctx, "extras", {}), "error")
+        await super().on_command_error(ctx, error)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        BotTree.cancel_defer(interaction)
+        self.observe_command("slash", command, interaction.extras, "ok")
+
+    async def close(self):
+        await self.metrics.stop()
+        await self.role_grants.stop()
+        await super().close()
+        await self.db.close()
 
-    
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
-        # Check if the reaction is on the specified message
-        if payload.message_id == self.message_id:
-            guild = self.get_guild(payload.guild_id)
-            member = guild.get_member(payload.user_id)
+        # Answer to a pending confirmation
+        if self.confirmations.dispatch(payload):
+            return
 
+        # Check if the reaction is on the guild's welcome message
+        if payload.guild_id is not None and payload.message_id == self.config.get(payload.guild_id).welcome_message_id:
             # Check if the emoji is what you expect (e.g., ✅)
             if str(payload.emoji) == "✅":
-                role = self.role_to_add
-                if role:
-                    await member.add_roles(role)
-                    print(f"Added role {role.name} to {member.name}")
+                self.role_grants.enqueue(payload.guild_id, payload.user_id, payload.member)
     
     def add_commands(self):
         @self.command(name="ping", description="lol")
-        @commands.has_role("mod")
+        @is_mod()
         async def ping(ctx):
             await ctx.send("pong")
         
@@ -102,6 +335,7 @@ class Bot(commands.Bot):
             '''
 
             members = [m for m in [member1, member2, member3, member4, member5] if m != None]
+            config = self.config.get(interaction.guild.id)
             logging.info(f"team called with args: team_name={team_name}, members={[m.name for m in members]}")
 
             # check permissions
@@ -110,42 +344,39 @@ class Bot(commands.Bot):
             if not override:
                 
                 # if team creation disabled, exit
-                if not os.getenv("TEAM_CREATION_ENABLED"):
+                if not config.team_creation_enabled:
                     logging.info(f"team: ignoring because team creation is disabled")
-                    await interaction.response.send_message(f"❌ Your team was not created; team creation is disabled right now.")
+                    await respond(interaction, f"❌ Your team was not created; team creation is disabled right now.")
                     return
 
                 # check run in correct channel
-                if not interaction.channel.name == "team-create":
+                if not interaction.channel.name == config.team_create_channel:
                     logging.info(f"team: ignoring because run in wrong channel")
-                    await interaction.response.send_message(f"❌ Your team was not created; you cannot run this command here.")
+                    await respond(interaction, f"❌ Your team was not created; you cannot run this command here.")
                     return
             
             # ===== check team name
             
             # check length of name
             if len(team_name) > 100:
-                await interaction.response.send_message(f"❌ Your team was not created; your team name is too long. The maximum team name length is 100 characters.")
+                await respond(interaction, f"❌ Your team was not created; your team name is too long. The maximum team name length is 100 characters.")
                 return
 
             # check validity of name
             valid_text_channel = "^([a-z0-9]+-)*[a-z0-9]+$" # valid regex match to something that can be a discord text channel
             if not re.search(valid_text_channel, team_name):
-                await interaction.response.send_message(f"❌ Your team was not created; your team name is invalid. Team names may only consist of **lowercase letters** and **digits** separated by **dashes**.\nA few examples of valid team names: `some-team`, `hackathon-winners`, `a-b-c-d-e-f`")
+                await respond(interaction, f"❌ Your team was not created; your team name is invalid. Team names may only consist of **lowercase letters** and **digits** separated by **dashes**.\nA few examples of valid team names: `some-team`, `hackathon-winners`, `a-b-c-d-e-f`")
                 return
             
             # ensure team name not already taken
-            if dget(interaction.guild.channels, name=team_name):
-                await interaction.response.send_message(f"❌ Your team was not created; there is already a team called `{team_name}`.")
+            names = self.names.get(interaction.guild)
+            if names.channel(team_name):
+                await respond(interaction, f"❌ Your team was not created; there is already a team called `{team_name}`.")
                 return
             
             # ensure team name won't cause conflicts with anything already in the server
-            if dget(interaction.guild.channels, name=team_name) \
-                or dget(interaction.guild.categories, name=team_name) \
-                or dget(interaction.guild.channels, name=team_name) \
-                or dget(interaction.guild.roles, name=team_name):
-
-                await interaction.response.send_message(f"❌ Your team was not created; the name `{team_name}` is not allowed.")
+            if names.name_taken(team_name):
+                await respond(interaction, f"❌ Your team was not created; the name `{team_name}` is not allowed.")
                 return
             
             # ===== check team members
@@ -155,33 +386,33 @@ class Bot(commands.Bot):
 
                 # already disincludes role mentions, need to disinclude bots
                 if member.bot:
-                    await interaction.response.send_message(f"❌ Your team was not created; you cannot have a bot on your team.")
+                    await respond(interaction, f"❌ Your team was not created; you cannot have a bot on your team.")
                     return
 
                 # ensure user not already in team
-                if len(member.roles) > 2:
-                    await interaction.response.send_message(f"❌ Your team was not created; at least one member is already in a team.")
+                if self.teams.team_of(interaction.guild.id, member.id):
+                    await respond(interaction, f"❌ Your team was not created; at least one member is already in a team.")
                     return
                 
                 # ensure user is a participant
                 can_create_with_member = False
                 for role in member.roles:
-                    if role.name == "participant":
+                    if role.name == config.participant_role:
                         can_create_with_member =True
                         break
 
                 if not can_create_with_member:
-                    await interaction.response.send_message(f"❌ Your team was not created; at least one member does not have the `@participant` role.")
+                    await respond(interaction, f"❌ Your team was not created; at least one member does not have the `@{config.participant_role}` role.")
                     return
                 
             # check for empty team
             if members == []:
-                await interaction.response.send_message(f"❌ Your team was not created; you cannot have an empty team!")
+                await respond(interaction, f"❌ Your team was not created; you cannot have an empty team!")
                 return
             
             # ensure sender is on the team
             if interaction.user not in members and not override: # organizer can create team without restriction
-                await interaction.response.send_message(f"❌ Your team was not created; you cannot create a team that you yourself are not on. (Ensure that you are one of the 5 users mentioned in one of the 'member' fields.)")
+                await respond(interaction, f"❌ Your team was not created; you cannot create a team that you yourself are not on. (Ensure that you are one of the 5 users mentioned in one of the 'member' fields.)")
                 return
                 
             # ===== team can be created
@@ -189,8 +420,7 @@ class Bot(commands.Bot):
             msg = "`[Command is being run in override mode.]`" if override else ""
             msg += f"The team `{team_name}` will be created, and members {' '.join([m.mention for m in members])} will be added.\n\n{interaction.user.mention}, please react to this message with ✅ to confirm, or ❌ to cancel."
 
-            await interaction.response.send_message(msg)
-            confirm_msg = await interaction.original_response()
+            confirm_msg = await respond(interaction, msg) or await interaction.original_response()
             confirmed = await get_confirmation(interaction.client, interaction.user, confirm_msg)
 
             if confirmed == None: # timed out
@@ -200,96 +430,199 @@ class Bot(commands.Bot):
                 return
             # otherwise, user confirmed, so we can proceed
 
-            # create team category & role
-            team_cat = await interaction.guild.create_category(name=team_name) # category to store team text & vc
-            team_role = await interaction.guild.create_role(name=team_name, mentionable=True, colour=discord.Colour.from_str("#adadad")) # team role
-
-            # Privatize category so that only team and some others can view
-            await team_cat.set_permissions(interaction.guild.default_role, read_messages=False) # @everyone can't view
-            await team_cat.set_permissions(team_role, read_messages=True)
-            for role_name in ['organizer', 'mentor', 'volunteer', 'sponsor', 'judge']:
-                await team_cat.set_permissions(
-                    dget(interaction.guild.roles, name=role_name), # get role with ID identified in config
-                    read_messages=True
-                )
-
-            # Create the text and voice channel
-            team_text = await interaction.guild.create_text_channel(name=team_name, category=team_cat)
-            team_vc = await interaction.guild.create_voice_channel(name=team_name, category=team_cat)
-            
-            # Add created role to all team members
-            for member in members:
-                await member.add_roles(team_role)
-
-            # React in confirmation and send notification in team text channel
-            await team_text.send(f'Hey {" ".join([member.mention for member in members])}! Here is your team category & channels.')
+            # another /team may have taken the name or a member while this one waited for ✅;
+            # checking and reserving happen together, with no await in between
+            if names.name_taken(team_name) or not self.teams.reserve(interaction.guild.id, team_name, [m.id for m in members]):
+                await confirm_msg.reply(f"❌ Team {team_name} was not created; the name or a member was taken by another team while waiting for confirmation.")
+                return
 
-            logging.info(f"Team created: {team_name}, {[m.name for m in members]}, {team_role}")
+            # create team role, category & channels, and add members to the role;
+            # journaled so a crash part way through is cleaned up on the next start
+            try:
+                op_id = await self.journal.begin("team", guild_id=interaction.guild.id, team_name=team_name, member_ids=[m.id for m in members])
+            except BaseException:
+                self.teams.release(interaction.guild.id, team_name)
+                raise
+            try:
+                result = await provision_team(
+                    interaction.guild, team_name, members, staff_roles=config.staff_roles, names=names,
+                    on_step=lambda step, object_id: self.journal.finished(op_id, step, object_id),
+                    on_wave=lambda steps: self.journal.started(op_id, steps),
+                )
+                await self.teams.add(
+                    interaction.guild.id, team_name, [m.id for m in members],
+                    role_id=result.role.id,
+                    category_id=result.category.id,
+                    text_channel_id=result.text.id,
+                    voice_channel_id=result.voice.id,
+                )
+            except discord.HTTPException:
+                await roll_back(interaction.guild, await self.journal.get(op_id), names)
+                await self.journal.close(op_id)
+                await confirm_msg.reply(f"❌ Team {team_name} could not be created; please try again.")
+                raise
+            finally:
+                self.teams.release(interaction.guild.id, team_name)
+            await self.journal.close(op_id)
+
+            logging.info(f"Team created: {team_name}, {[m.name for m in members]}, {result.role} ({result.summary()})")
         
-        @self.command(name="hitch", description="lol")
-        @commands.has_role("mod")
-        async def hitch(ctx):
-            embed = discord.Embed(
-                title="Introduction",
-                description="Hi folks! This is HackED's official HitchHacker's Guide To The Galaxy. Contained in this channel is everything you'll need to get the most out of your hackathon experience, as well as the answers to a lot of questions you might have throughout the hackathon; it's a reference for safety information, the event schedule, project guidelines, submission instructions, and more.\n Please use the search function or the links provided to navigate the Guide (and, if you have any questions that aren't answered, ask us in <#1336202563548086301>!",
-                color=62441  # You can use any color here
-            )
-            await ctx.send(embed=embed)
+        @self.command(name="import_teams", description="Creates teams in bulk from a CSV or JSON file.")
+        @is_mod()
+        async def import_teams(ctx, action: Optional[str] = None, team_name: Optional[str] = None):
+            """
+            Creates every team in the attached file, after checking them all against the server.
 
-            embed = discord.Embed(
-                title="`Health & Safety Information`",
-                description="- HackED has absolutely zero tolerance for sexual harassment or misconduct. Any form of this behavior could result in expulsion from the event and a follow-up with the Office of the Dean.\n - HackED has absolutely zero tolerance for violence or threats to other participants.\n\n ### `Transit`\n - For your safety, participants are **strongly discouraged from leaving the event in the middle of the night**.\n- This is not an overnight event, the event area will close at 10 PM each night, please coordinate a safe ride home.\n- Edmonton public transit routes stop running at some point during the night. If you do plan to take transit home late at night, please **make sure your route is still running**. More information about exact times for individual routes can be found [here](https://www.edmonton.ca/sites/default/files/public-files/assets/transit/ETS-Route-Frequency-Table-Sept-2023.pdf).\n- The University of Alberta's Safewalk program will not be running during the event, as it is a weekend.\n - For a safe ride home, dial #TAXI on your cell phone.\n\n ### `Food & Drink`\n- HackED aims to promote healthy work habits and environments. We ask participants to **prioritize their own mental and physical health** as much as possible, above hackathon participation or projects.\n- Staying well-fed and hydrated are important! Please take time to eat and drink water throughout the event.\n- We will provide **snacks** throughout the event and **dinner** on Saturday and Sunday.\n- There is a water fountain available at our in-person location on DICE 8F. \n- Participants are also encouraged to bring what they need to eat for as long as they plan to stay on-campus.",
-                color=62441
-            )
+            CSV: one team per line, `team_name,member_id,member_id,...` (ids or mentions).
+            JSON: `[{"team_name": "some-team", "members": [id, ...]}, ...]`.
+            Without an attachment, resumes the teams an earlier import didn't finish.
+            Teams that failed are left alone until `~import_teams retry [team]` queues them
+            again or `~import_teams cancel [team]` drops them (deleting what they created).
+            """
+            if ctx.guild.id in self.imports:
+                await ctx.send("An import is already running in this server.", delete_after=10)
+                return
+            # held through the confirmation wait, so a second import can't pass the check above
+            # and run the same pending teams; `start_import` swaps in the task
+            self.imports[ctx.guild.id] = None
+            try:
+                if action not in (None, "retry", "cancel"):
+                    await ctx.send(f"❌ Unknown action `{action}`; use `retry` or `cancel`, or attach a file.")
+                    return
+                if action == "cancel":
+                    with priority(PROVISION):
+                        dropped = await RosterImport.cancel(self.db, ctx.guild, team_name, self.names.get(ctx.guild))
+                    await ctx.send(f"✅ Dropped {len(dropped)} unfinished team(s): {', '.join(f'`{name}`' for name in dropped)}" if dropped else "Nothing to cancel.")
+                    return
+                if action == "retry" and not await RosterImport.retry(self.db, ctx.guild.id, team_name):
+                    await ctx.send("Nothing to retry.")
+                    return
 
-            await ctx.send(embed=embed)
+                names = self.names.get(ctx.guild)
+                config = self.config.get(ctx.guild.id)
+                unfinished = await RosterImport.unfinished(self.db, ctx.guild.id)
+                failed = await RosterImport.failed_jobs(self.db, ctx.guild.id)
+                job = RosterImport(ctx.guild, self.db, self.teams, names, staff_roles=config.staff_roles, members=self.members)
+
+                if ctx.message.attachments:
+                    attachment = ctx.message.attachments[0]
+                    try:
+                        entries = parse_roster(await attachment.read(), attachment.filename)
+                    except ValueError as e:
+                        await ctx.send(f"❌ Could not read `{attachment.filename}`: {e}")
+                        return
+                    if not entries:
+                        await ctx.send(f"❌ `{attachment.filename}` has no teams in it.")
+                        return
+
+                    # look up everyone named in the file up front, 100 per request
+                    await self.members.get_many(ctx.guild, [member_id for entry in entries for member_id in entry.member_ids])
+                    # failed teams may be re-listed (with corrected members); their names can already exist
+                    resumable = {**{name: [] for name in failed}, **unfinished}
+                    entries, errors = validate_roster(ctx.guild, entries, names, self.teams, resumable, config.participant_role)
+                    if errors:
+                        await ctx.send(f"❌ No teams were created; {len(errors)} problem(s) found:")
+
+                        async def problems():
+                            for error in errors:
+                                yield f"• {error}\n"
+
+                        await send_text(ctx, problems())
+                        return
+
+                    confirm_msg = await ctx.send(
+                        f"{len(entries)} team(s) will be created from `{attachment.filename}`.\n\n"
+                        f"{ctx.author.mention}, please react to this message with ✅ to confirm, or ❌ to cancel."
+                    )
+                    confirmed = await get_confirmation(self, ctx.author, confirm_msg)
+                    if not confirmed:
+                        if confirmed == False:
+                            await confirm_msg.reply("No teams were created.")
+                        return
+                    await job.queue(entries)
+                elif not unfinished:
+                    msg = "Nothing to resume; attach a CSV or JSON file of teams to import."
+                    if failed:
+                        msg += f" {len(failed)} team(s) failed earlier (`~import_teams retry` or `~import_teams cancel`): " + ", ".join(f"`{name}` ({error})" for name, error in failed.items())
+                    await ctx.send(msg[:2000])
+                    return
 
-            embed = discord.Embed(
-                title="`Leaving & Reentering The Building`",
-                description="- If you leave and reenter the building, **you must sign out and back in at the front desk.**\n- Elevators in this building require a key-pass after hours. If you get stuck downstairs and aren't able to use the elevators, send a message in <#1339085635310452746> and a volunteer will let you in.\n- It is possible to get locked in the stairwell near the water fountain. If that happens, send a message in <#1339085635310452746> and a volunteer will let you in.",
-                color=62441
-            )
+                status = await ctx.send("🛠️ Creating teams…")
 
-            await ctx.send(embed=embed)
+                async def progress(job):
+                    await status.edit(content=f"🛠️ Creating teams… {job.done}/{job.total} done, {len(job.failed)} failed ({job.elapsed:.0f}s)")
 
-            embed = discord.Embed(
-                title="`Housekeeping`",
-                description="- Keep the area clean!\n- There are washrooms near the front desk.\n- A map of gender-neutral washrooms on campus can be found [here](https://www.ualberta.ca/maps.html?l=53.52805170773808,-113.52846739613842&z=18&campus=north_campus&c=All-Gender%20Washrooms). There are several on the first and second floors of the building.",
-                color=62441
-            )
+                job.progress = progress
+                await self.start_import(job)
 
-            await ctx.send(embed=embed)
+                result = f"✅ Created {job.done}/{job.total} team(s) in {job.elapsed:.0f}s."
+                if job.failed:
+                    result += " Failed (`~import_teams retry` to try again, `~import_teams cancel` to drop): " + ", ".join(f"`{name}` ({error})" for name, error in job.failed.items())
+                await status.edit(content=result[:2000])
+            finally:
+                if self.imports.get(ctx.guild.id) is None:
+                    self.imports.pop(ctx.guild.id, None)
 
-            embed = discord.Embed(
-                title="`Workshops`",
-                description="Throughout HackED we will be hosting a variety of awesome workshops where you can learn new skills that might be helpful for your project (and for career development and personal projects outside the hackathon!) The workshops will be run by our sponsor representatives and industry professionals.\nYou can check out the workshop schedule in the Events of this Discord server, or in <#1336202563011477559>. Announcements and information about each workshop (e.g. where to find it) will be sent out shortly before each workshop!",
-                color=62441
-            )
-
-            await ctx.send(embed=embed)
+        @self.command(name="hitch", description="lol")
+        @is_mod()
+        async def hitch(ctx):
+            """Posts the guide from guide.json, or edits the messages that changed since it was last posted here."""
+            with priority(BULK):
+                sent, edited, unchanged = await self.guide.publish(ctx.channel)
+            logging.info(f"hitch: {sent} sent, {edited} edited, {unchanged} unchanged")
+        
+        @self.group(name="clear", description="lol", invoke_without_command=True)
+        @is_mod()
+        async def clear(ctx, *, flags: ClearFlags):
+            """
+            Clears all messages in the channel.
 
+            Optional filters: `author: @someone`, `before: <message id>`, `after: <message id>`, `keep_pinned: yes`.
+            Run `~clear stop` to cancel a purge in progress.
+            """
+            if ctx.channel.id in self.purges:
+                await ctx.send("A purge is already running here; `~clear stop` cancels it.", delete_after=10)
+                return
 
-            embed = discord.Embed(
-                title="`Team Creation Details`",
-                description="To create a team, run the /team command in <#1336202563548086300>. \n- Teams may have anywhere from 1 to 5 people (inclusive), and may consist of any combination of in-person and virtual participants.\n- The team you create on Discord is our official record of your team's participants and is what we will use for prize distribution.\n- If you want to add/remove someone to/from your team, please ping <@1264055395454816256>.",
-                color=62441
-            )
+            status = await ctx.send("🧹 Clearing…")
 
-            await ctx.send(embed=embed)
+            async def progress(job):
+                await status.edit(content=f"🧹 Clearing… {job.deleted} deleted, {job.scanned} scanned ({job.elapsed:.0f}s)")
 
-            embed = discord.Embed(
-                title="`Judging Signup Details`",
-                description="### Signup \n Run the /judging command to signup after the signup time starts. More information on this will be found in <#1336202563011477557>.",
-                color=62441
+            job = PurgeJob(
+                ctx.channel,
+                author=flags.author,
+                before=flags.before,
+                after=flags.after,
+                keep_pinned=flags.keep_pinned,
+                skip=[status.id],
+                watch=await self.guide.posted_ids(ctx.channel.id),
+                progress=progress,
             )
-
-            await ctx.send(embed=embed)
-        
-        @self.command(name="clear", description="lol")
-        @commands.has_role("mod")
-        async def clear(ctx):
-            """Clears all messages in the channel."""
-            await ctx.channel.purge()
+            with priority(BULK):
+                task = asyncio.create_task(job.run())
+            self.purges[ctx.channel.id] = task
+            try:
+                await task
+                result = f"🧹 Cleared {job.deleted} message(s) in {job.elapsed:.0f}s."
+            except asyncio.CancelledError:
+                result = f"🛑 Purge stopped after {job.deleted} message(s)."
+            finally:
+                self.purges.pop(ctx.channel.id, None)
+                if job.watched_deleted:
+                    await self.guide.forget(ctx.channel.id, job.watched_deleted)
+            if job.failed:
+                result += f" {job.failed} could not be deleted."
+            await status.edit(content=result, delete_after=10)
+
+        @clear.command(name="stop", description="Stops a purge in progress.")
+        @is_mod()
+        async def clear_stop(ctx):
+            task = self.purges.get(ctx.channel.id)
+            if task is None:
+                await ctx.send("No purge is running here.", delete_after=10)
+                return
+            task.cancel()
 
         @self.tree.command(name="judging", description="Add your project's submission for HackED.")
         @app_commands.describe(devpost="The link to the devpost")
@@ -299,32 +632,34 @@ class Bot(commands.Bot):
             devpost: str,
             github: str
         ):
-            # check run in correct channel
-            if interaction.channel.category.name.lower() == "general":
-                await interaction.response.send_message(f"❌ You cannot run this command here. Please run it in your team channel.")
+            # check run in a team channel
+            team = self.teams.for_channel(interaction.channel)
+            if team is None:
+                await respond(interaction, f"❌ You cannot run this command here. Please run it in your team channel.")
                 return
-            
-            # team_name = interaction.channel.name
 
-            # sql = """
-            # INSERT OR REPLACE INTO submissions
-            #     (team_name, devpost, github)
-            # VALUES
-            #     (?, ?, ?)
-            # """ 
-
-            # self.cursor.execute(sql, (
-            #     team_name,
-            #     devpost,
-            #     github
-            # ))
-            # self.conn.commit()
-
-            await interaction.response.send_message(f"Sorry this command is unavailable right now.")
+            # if judging signup disabled, exit
+            if not self.config.get(interaction.guild.id).judging_enabled:
+                await respond(interaction, f"Sorry this command is unavailable right now.")
+                return
 
-            # await interaction.response.send_message(
-            #     ":white_check_mark: Your submission has been recorded!"
-            # )
+            sql = """
+            INSERT OR REPLACE INTO submissions
+                (guild_id, team_name, devpost, github)
+            VALUES
+                (?, ?, ?, ?)
+            """ 
+
+            await self.db.execute(sql, (
+                interaction.guild.id,
+                team.name,
+                devpost,
+                github
+            ))
+
+            await respond(interaction,
+                ":white_check_mark: Your submission has been recorded!"
+            )
 
             return
 
@@ -332,61 +667,142 @@ class Bot(commands.Bot):
         async def withdraw_judging( 
             interaction: discord.Interaction
         ):
-            # check run in correct channel
-            if interaction.channel.category.name.lower() == "general":
-                await interaction.response.send_message(f"❌ You cannot run this command here. Please run it in your team channel.")
+            # check run in a team channel
+            team = self.teams.for_channel(interaction.channel)
+            if team is None:
+                await respond(interaction, f"❌ You cannot run this command here. Please run it in your team channel.")
                 return
-            
-            team_name = interaction.channel.name
 
-            self.cursor.execute(
-                "DELETE FROM submissions WHERE team_name = ?",
-                (team_name,)
-             )
-            self.conn.commit()
+            await self.db.execute(
+                "DELETE FROM submissions WHERE guild_id = ? AND team_name = ?",
+                (interaction.guild.id, team.name)
+            )
 
-            # await interaction.response.send_message(f"Please wait for the announcement before you run this command.")
+            # await respond(interaction, f"Please wait for the announcement before you run this command.")
 
-            await interaction.response.send_message(
+            await respond(interaction,
                 ":white_check_mark: Your submission has been removed!"
             )
 
             return
         
         @self.command(name="judging_list", description="Displays all registered teams.")
-        @commands.has_role("mod") 
-        async def judging_list(ctx):
+        @is_mod()
+        async def judging_list(ctx, mode: str = "text"):
             """
             Lists all teams that have been registered in the submissions table,
             using 'team_name' instead of 'channel_name'.
+
+            `mode` is one of `text` (default; packed messages), `embed` (up to 10 embeds
+            per message), or `csv`/`json` (the whole list as a single file).
             """
+            if mode not in ("text", "embed", "csv", "json"):
+                await ctx.send(f"❌ Unknown mode `{mode}`; use one of `text`, `embed`, `csv`, `json`.")
+                return
+
+            names = self.names.get(ctx.guild)
+
+            def members_of(team_name):
+                team = self.teams.get(ctx.guild.id, team_name)
+                if team is not None:
+                    return team.mentions()
+                # team predates the registry
+                role = names.role(team_name)
+                return " ".join([member.mention for member in role.members]) if role else ""
+
+            # Stream rows from the database
+            rows = self.db.iterate("SELECT team_name, devpost, github FROM submissions WHERE guild_id = ? ORDER BY RANDOM()", (ctx.guild.id,))
+            lines = []
 
-            # Query the database
-            self.cursor.execute("SELECT team_name, devpost, github FROM submissions ORDER BY RANDOM()")
-            teams = self.cursor.fetchall()
+            async def entries():
+                async for team_name, devpost, github in rows:
+                    lines.append(
+                        f"**Team Name:** {team_name}\n"
+                        f"• Devpost: {devpost}\n"
+                        f"• GitHub:  {github}\n"
+                        f"• Members: {members_of(team_name)}\n"
+                        "----------------------------------------\n"
+                    )
+                    yield lines[-1]
+
+            async def embeds():
+                async for team_name, devpost, github in rows:
+                    member_lines = members_of(team_name)
+                    lines.append(team_name)
+                    embed = discord.Embed(title=team_name, color=62441)
+                    # submissions are free text; a field over 1,024 characters fails the whole message
+                    embed.add_field(name="Devpost", value=clip(devpost or "-", EMBED_FIELD_LIMIT), inline=False)
+                    embed.add_field(name="GitHub", value=clip(github or "-", EMBED_FIELD_LIMIT), inline=False)
+                    embed.add_field(name="Members", value=clip(member_lines or "-", EMBED_FIELD_LIMIT), inline=False)
+                    yield embed
+
+            # pages of results yield to interaction replies
+            with priority(BULK):
+                if mode in ("csv", "json"):
+                    export = []
+                    async for team_name, devpost, github in rows:
+                        export.append({"team_name": team_name, "devpost": devpost, "github": github, "members": members_of(team_name)})
+                        lines.append(team_name)
+                    sent = 0
+                    if export:
+                        await ctx.send(f"{len(export)} team(s) registered.", file=export_file(export, mode, "judging_list"))
+                        sent = 1
+                elif mode == "embed":
+                    sent = await send_embeds(ctx, embeds())
+                else:
+                    sent = await send_text(ctx, entries())
 
             # If there are no teams, just let the user know
-            if not teams:
+            if not sent:
                 await ctx.send("No teams have registered yet!")
                 return
 
-            # Build a response message
-            lines = []
-            for team_name, devpost, github in teams:
-                role = discord.utils.get(ctx.guild.roles, name=team_name)
-                members_with_role = role.members
-                member_lines = " ".join([member.mention for member in members_with_role])
-                lines.append(
-                    f"**Team Name:** {team_name}\n"
-                    f"• Devpost: {devpost}\n"
-                    f"• GitHub:  {github}\n"
-                    f"• Members: {member_lines}\n"
-                    "----------------------------------------\n"
-                )
-                sent = await ctx.send(lines[-1])
-                await sent.edit(suppress=True)
-
             self.team_list = lines
 
-            # Send the response
-            # await ctx.send(response)
+        @self.command(name="grants", description="Shows the reaction role queue.")
+        @is_mod()
+        async def grants(ctx):
+            w = self.role_grants
+            await ctx.send(
+                f"Queue depth: {w.depth}\n"
+                f"Granted: {w.granted}, skipped (already had role): {w.skipped}, failed: {w.failed}\n"
+                f"Grant latency: p50 {w.latency(0.5):.2f}s, p99 {w.latency(0.99):.2f}s"
+            )
+
+        @self.command(name="sync_teams", description="Registers teams created before the team registry existed.")
+        @is_mod()
+        async def sync_teams(ctx):
+            if not ctx.guild.chunked:
+                await ctx.guild.chunk()  # role.members needs every member cached
+            config = self.config.get(ctx.guild.id)
+            added = await self.teams.import_guild(ctx.guild, exclude=[*config.staff_roles, config.mod_role, config.participant_role])
+            await ctx.send(f"Registered {added} existing team(s); {len(self.teams.teams(ctx.guild.id))} team(s) known in this server.")
+
+        @self.command(name="config", description="Shows or changes this server's bot settings.")
+        @is_mod()
+        async def config(ctx, key: Optional[str] = None, *, value: Optional[str] = None):
+            """
+            `~config` lists this server's settings, `~config <key> <value>` changes one,
+            and `~config <key> default` puts it back. Lists are comma separated.
+            """
+            settings = self.config.get(ctx.guild.id)
+            if key is None:
+                lines = [f"`{k}`: {v}" for k, v in settings.as_dict().items()]
+                await ctx.send("\n".join(lines))
+                return
+            if key not in self.config.defaults:
+                await ctx.send(f"❌ Unknown setting `{key}`; use one of {', '.join(f'`{k}`' for k in self.config.defaults)}.")
+                return
+            if value is None:
+                await ctx.send(f"`{key}`: {getattr(settings, key)}")
+                return
+            if value == "default":
+                await self.config.reset(ctx.guild.id, key)
+                await ctx.send(f"✅ `{key}` is back to {getattr(settings, key)}.")
+                return
+            try:
+                old, new = await self.config.set(ctx.guild.id, key, self.config.parse(key, value))
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+            await ctx.send(f"✅ `{key}` changed from {old} to {new}.")
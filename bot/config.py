@@ -0,0 +1,114 @@
+import copy
+import json
+import logging
+import os
+from typing import Any, Dict, Tuple
+
+from .provision import STAFF_ROLES
+from .storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (guild_id, key)
+);
+"""
+
+
+def _env_flag(name: str) -> bool:
+    return bool(os.getenv(name))
+
+
+def defaults() -> Dict[str, Any]:
+    '''Settings for a guild that hasn't changed them; the env vars keep working as deployment-wide defaults.'''
+    return {
+        "welcome_message_id": int(os.getenv("WELCOME_MESSAGE_ID") or 0) or 1336237048696275007,  # the message to watch for reactions
+        "welcome_channel_id": int(os.getenv("WELCOME_CHANNEL_ID") or 0),  # the channel holding it, for backfill
+        "participant_role": "participant",
+        "mod_role": "mod",
+        "staff_roles": list(STAFF_ROLES),
+        "team_create_channel": "team-create",
+        "team_creation_enabled": _env_flag("TEAM_CREATION_ENABLED"),
+        "judging_enabled": _env_flag("JUDGING_ENABLED"),
+    }
+
+
+class GuildConfig:
+    '''One guild's settings, as attributes named after the keys in `defaults()`.'''
+
+    def __init__(self, guild_id: int, values: Dict[str, Any]) -> None:
+        self.guild_id = guild_id
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if key != "guild_id"}
+
+
+class ConfigCache:
+    '''
+    Per-guild settings, loaded from `guild_config` once at startup and served from memory.
+    Updates write through to the database.
+    '''
+
+    def __init__(self, db: Storage) -> None:
+        self.db = db
+        self.defaults = defaults()
+        self._guilds: Dict[int, GuildConfig] = {}
+
+    async def load(self) -> None:
+        await self.db.executescript(SCHEMA)
+        self._guilds.clear()
+        for guild_id, key, value in await self.db.fetchall("SELECT guild_id, key, value FROM guild_config"):
+            if key not in self.defaults:
+                logging.warning(f"config: ignoring unknown setting {key} for guild {guild_id}")
+                continue
+            setattr(self.get(guild_id), key, json.loads(value))
+        logging.info(f"config: loaded settings for {len(self._guilds)} guild(s)")
+
+    def get(self, guild_id: int) -> GuildConfig:
+        config = self._guilds.get(guild_id)
+        if config is None:
+            config = self._guilds[guild_id] = GuildConfig(guild_id, copy.deepcopy(self.defaults))
+        return config
+
+    def parse(self, key: str, text: str) -> Any:
+        '''Parses a value typed in chat into the type of `key`'s default. Raises KeyError/ValueError.'''
+        default = self.defaults[key]
+        if isinstance(default, bool):
+            if text.lower() in ("1", "yes", "true", "on"):
+                return True
+            if text.lower() in ("0", "no", "false", "off"):
+                return False
+            raise ValueError(f"`{key}` takes yes or no")
+        if isinstance(default, int):
+            try:
+                return int(text.strip("<#>"))
+            except ValueError:
+                raise ValueError(f"`{key}` takes an id")
+        if isinstance(default, list):
+            return [item.strip() for item in text.split(",") if item.strip()]
+        return text
+
+    async def set(self, guild_id: int, key: str, value: Any) -> Tuple[Any, Any]:
+        '''Stores a setting. Returns (old, new).'''
+        if key not in self.defaults:
+            raise KeyError(key)
+        config = self.get(guild_id)
+        old = getattr(config, key)
+        await self.db.execute(
+            "INSERT OR REPLACE INTO guild_config (guild_id, key, value) VALUES (?, ?, ?)",
+            (guild_id, key, json.dumps(value)),
+        )
+        setattr(config, key, value)
+        return old, value
+
+    async def reset(self, guild_id: int, key: str) -> None:
+        '''Reverts a setting to the default.'''
+        if key not in self.defaults:
+            raise KeyError(key)
+        await self.db.execute("DELETE FROM guild_config WHERE guild_id = ? AND key = ?", (guild_id, key))
+        setattr(self.get(guild_id), key, copy.deepcopy(self.defaults[key]))
+
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable, List, Optional, Set, Tuple
+
+import discord
+
+from .render import pack_embeds
+from .storage import Storage
+
+GUIDE_PATH = os.path.join(os.path.dirname(__file__), "guide.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guide_messages (
+    channel_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (channel_id, position)
+);
+"""
+
+
+class Guide:
+    '''
+    The HitchHacker's Guide, loaded from `guide.json` into prebuilt embeds and packed
+    into as few messages as possible. Publishing remembers which message holds which
+    embeds, so re-publishing only edits the messages whose content changed.
+    '''
+
+    def __init__(self, db: Storage, path: str = GUIDE_PATH) -> None:
+        self.db = db
+        self.path = path
+        self._mtime = None
+        self.messages: List[List[discord.Embed]] = []
+        self.hashes: List[str] = []
+
+    def load(self) -> bool:
+        '''(Re)loads the data file if it changed on disk. Returns True if it was reloaded.'''
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        embeds = [discord.Embed.from_dict(embed) for embed in data["embeds"]]
+        self.messages = pack_embeds(embeds)
+        self.hashes = [
+            hashlib.sha256(json.dumps([e.to_dict() for e in message], sort_keys=True).encode()).hexdigest()
+            for message in self.messages
+        ]
+        self._mtime = mtime
+        return True
+
+    async def publish(self, channel: discord.TextChannel) -> Tuple[int, int, int]:
+        '''
+        Posts the guide to `channel`, editing previously posted messages in place.
+        Returns (sent, edited, unchanged).
+        '''
+        self.load()
+        posted = {
+            position: (message_id, digest)
+            for position, message_id, digest in await self.db.fetchall(
+                "SELECT position, message_id, hash FROM guide_messages WHERE channel_id = ?", (channel.id,)
+            )
+        }
+        sent = edited = unchanged = 0
+
+        for position, (embeds, digest) in enumerate(zip(self.messages, self.hashes)):
+            message_id, old_digest = posted.pop(position, (None, None))
+            if message_id is not None and old_digest == digest:
+                unchanged += 1
+                continue
+            if message_id is not None:
+                try:
+                    await channel.get_partial_message(message_id).edit(embeds=embeds)
+                    edited += 1
+                except discord.NotFound:
+                    message_id = None  # deleted (e.g. by `clear`), post it again
+            if message_id is None:
+                message = await channel.send(embeds=embeds)
+                message_id = message.id
+                sent += 1
+            await self.db.execute(
+                "INSERT OR REPLACE INTO guide_messages (channel_id, position, message_id, hash) VALUES (?, ?, ?, ?)",
+                (channel.id, position, message_id, digest),
+            )
+
+        # the guide got shorter: remove messages past the end
+        for position, (message_id, _) in posted.items():
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
+            await self.db.execute(
+                "DELETE FROM guide_messages WHERE channel_id = ? AND position = ?", (channel.id, position)
+            )
+
+        logging.info(f"guide: published to #{channel.name}: {sent} sent, {edited} edited, {unchanged} unchanged")
+        return sent, edited, unchanged
+
+    async def posted_ids(self, channel_id: int) -> Set[int]:
+        rows = await self.db.fetchall("SELECT message_id FROM guide_messages WHERE channel_id = ?", (channel_id,))
+        return {message_id for message_id, in rows}
+
+    async def forget(self, channel_id: int, message_ids: Optional[Iterable[int]] = None) -> None:
+        '''Drops posted message ids for a channel (all of them by default) after they were deleted.'''
+        if message_ids is None:
+            await self.db.execute("DELETE FROM guide_messages WHERE channel_id = ?", (channel_id,))
+        else:
+            await self.db.executemany(
+                "DELETE FROM guide_messages WHERE channel_id = ? AND message_id = ?",
+                [(channel_id, message_id) for message_id in message_ids],
+            )
@@ -0,0 +1,127 @@
+from typing import Dict, Optional
+
+import discord
+
+
+class _Names:
+    '''name -> {id: object}; several objects may share a name.'''
+
+    def __init__(self) -> None:
+        self._by_name: Dict[str, Dict[int, object]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(objs) for objs in self._by_name.values())
+
+    def add(self, obj) -> None:
+        self._by_name.setdefault(obj.name, {})[obj.id] = obj
+
+    def remove(self, obj) -> None:
+        objs = self._by_name.get(obj.name)
+        if objs is None:
+            return
+        objs.pop(obj.id, None)
+        if not objs:
+            del self._by_name[obj.name]
+
+    def update(self, before, after) -> None:
+        self.remove(before)
+        self.add(after)
+
+    def get(self, name: str):
+        objs = self._by_name.get(name)
+        if not objs:
+            return None
+        return next(iter(objs.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+
+class GuildIndex:
+    '''
+    Name lookups for one guild's channels, categories and roles.
+
+    `channels` mirrors `guild.channels`, so it includes categories too,
+    matching what `discord.utils.get(guild.channels, name=...)` would find.
+    '''
+
+    def __init__(self, guild: discord.Guild) -> None:
+        self.guild_id = guild.id
+        self.channels = _Names()
+        self.categories = _Names()
+        self.roles = _Names()
+        for channel in guild.channels:
+            self.add_channel(channel)
+        for role in guild.roles:
+            self.roles.add(role)
+
+    def add_channel(self, channel: discord.abc.GuildChannel) -> None:
+        self.channels.add(channel)
+        if isinstance(channel, discord.CategoryChannel):
+            self.categories.add(channel)
+
+    def remove_channel(self, channel: discord.abc.GuildChannel) -> None:
+        self.channels.remove(channel)
+        if isinstance(channel, discord.CategoryChannel):
+            self.categories.remove(channel)
+
+    def update_channel(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+        self.remove_channel(before)
+        self.add_channel(after)
+
+    def channel(self, name: str) -> Optional[discord.abc.GuildChannel]:
+        return self.channels.get(name)
+
+    def category(self, name: str) -> Optional[discord.CategoryChannel]:
+        return self.categories.get(name)
+
+    def role(self, name: str) -> Optional[discord.Role]:
+        return self.roles.get(name)
+
+    def name_taken(self, name: str) -> bool:
+        '''True if any channel, category or role already uses `name`.'''
+        return name in self.channels or name in self.categories or name in self.roles
+
+
+class NameIndex:
+    '''
+    Per-guild name -> object index, built when a guild becomes available and kept
+    current from the channel/role create, update and delete gateway events.
+    '''
+
+    def __init__(self) -> None:
+        self._guilds: Dict[int, GuildIndex] = {}
+
+    def build(self, guild: discord.Guild) -> GuildIndex:
+        index = GuildIndex(guild)
+        self._guilds[guild.id] = index
+        return index
+
+    def drop(self, guild: discord.Guild) -> None:
+        self._guilds.pop(guild.id, None)
+
+    def get(self, guild: discord.Guild) -> GuildIndex:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index = self.build(guild)
+        return index
+
+    # ===== gateway event hooks
+
+    def channel_created(self, channel: discord.abc.GuildChannel) -> None:
+        self.get(channel.guild).add_channel(channel)
+
+    def channel_deleted(self, channel: discord.abc.GuildChannel) -> None:
+        self.get(channel.guild).remove_channel(channel)
+
+    def channel_updated(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+        self.get(after.guild).update_channel(before, after)
+
+    def role_created(self, role: discord.Role) -> None:
+        self.get(role.guild).roles.add(role)
+
+    def role_deleted(self, role: discord.Role) -> None:
+        self.get(role.guild).roles.remove(role)
+
+    def role_updated(self, before: discord.Role, after: discord.Role) -> None:
+        self.get(after.guild).roles.update(before, after)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import discord
+from discord.utils import get as dget
+
+from .index import GuildIndex, NameIndex
+from .members import MemberFetcher
+from .provision import STAFF_ROLES, provision_team
+from .scheduler import PROVISION, priority
+from .storage import Storage
+from .teams import TeamRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS provision_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    step TEXT,
+    object_id INTEGER,
+    payload TEXT,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS provision_journal_op ON provision_journal (op_id);
+"""
+# events: `begin` (payload = what the operation is for), `start` (a step is about to be sent),
+# `done` (a step finished; object_id = what it created)
+
+# the steps that create something, and where to look for it by name if it was in flight
+CREATE_STEPS = ("create_role", "create_category", "create_text_channel", "create_voice_channel")
+
+
+class JournalOp:
+    __slots__ = ("op_id", "kind", "payload", "started", "done")
+
+    def __init__(self, op_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        self.op_id = op_id
+        self.kind = kind
+        self.payload = payload
+        self.started: Set[str] = set()
+        self.done: Dict[str, int] = {}  # step -> id of what it created
+
+    @property
+    def in_flight(self) -> Set[str]:
+        return self.started - set(self.done)
+
+
+class Journal:
+    '''
+    Write-ahead journal of provisioning operations.
+
+    An operation is logged (and flushed) before its first REST call, each wave's steps are
+    logged before they're sent, and completed steps are appended as they finish. Appends
+    are buffered and written in one batch per flush; only `begin` and `start` wait for the
+    write, since a lost `done` can still be recovered by name. When an operation completes
+    its entries are deleted, so the journal only ever holds what was in flight and
+    recovery costs time proportional to that, not to the size of the guild.
+    '''
+
+    def __init__(self, db: Storage) -> None:
+        self.db = db
+        self._buffer: List[Tuple] = []
+        self._flushing: Optional[asyncio.Task] = None
+        self.opened: Set[str] = set()  # operations begun by this process and not yet closed
+
+    def _append(self, op_id: str, event: str, step: Optional[str] = None, object_id: Optional[int] = None, payload: Optional[str] = None) -> None:
+        self._buffer.append((op_id, event, step, object_id, payload, time.time()))
+        if self._flushing is None:
+            self._flushing = asyncio.create_task(self._flush_loop(), name="journal-flush")
+
+    async def _flush_loop(self) -> None:
+        try:
+            while self._buffer:
+                rows, self._buffer = self._buffer, []
+                await self.db.executemany(
+                    "INSERT INTO provision_journal (op_id, event, step, object_id, payload, at) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        finally:
+            self._flushing = None
+
+    async def flush(self) -> None:
+        '''Waits until everything appended so far is written.'''
+        if self._flushing is not None:
+            await asyncio.shield(self._flushing)
+
+    # ===== writing
+
+    async def begin(self, kind: str, **payload) -> str:
+        op_id = uuid.uuid4().hex
+        self.opened.add(op_id)
+        self._append(op_id, "begin", kind, None, json.dumps(payload))
+        await self.flush()
+        return op_id
+
+    async def started(self, op_id: str, steps: List[str]) -> None:
+        for step in steps:
+            self._append(op_id, "start", step)
+        await self.flush()
+
+    async def finished(self, op_id: str, step: str, object_id: int) -> None:
+        self._append(op_id, "done", step, object_id)
+
+    async def close(self, op_id: str) -> None:
+        '''Ends an operation, whether it completed or was rolled back.'''
+        await self.flush()
+        await self.db.execute("DELETE FROM provision_journal WHERE op_id = ?", (op_id,))
+        self.opened.discard(op_id)
+
+    # ===== reading
+
+    async def incomplete(self) -> List[JournalOp]:
+        '''Every operation that was begun but not closed, oldest first.'''
+        await self.flush()
+        ops: Dict[str, JournalOp] = {}
+        async for op_id, event, step, object_id, payload in self.db.iterate(
+            "SELECT op_id, event, step, object_id, payload FROM provision_journal ORDER BY seq"
+        ):
+            if event == "begin":
+                ops[op_id] = JournalOp(op_id, step, json.loads(payload))
+            elif op_id in ops:
+                if event == "start":
+                    ops[op_id].started.add(step)
+                elif event == "done":
+                    ops[op_id].done[step] = object_id or 0
+        return list(ops.values())
+
+    async def get(self, op_id: str) -> Optional[JournalOp]:
+        for op in await self.incomplete():
+            if op.op_id == op_id:
+                return op
+        return None
+
+
+def _created(guild: discord.Guild, op: JournalOp, names: Optional[GuildIndex] = None) -> List[Any]:
+    '''
+    What the operation created that still exists, including anything whose create was in
+    flight. Those are found by name, through `names` if given rather than a scan of the guild.
+    '''
+    team_name = op.payload["team_name"]
+    found = {}
+    for step in CREATE_STEPS:
+        if op.done.get(step):
+            obj = guild.get_role(op.done[step]) if step == "create_role" else guild.get_channel(op.done[step])
+        elif step in op.in_flight:
+            if step == "create_role":
+                obj = names.role(team_name) if names is not None else dget(guild.roles, name=team_name)
+            elif step == "create_category":
+                obj = names.category(team_name) if names is not None else dget(guild.categories, name=team_name)
+            else:
+                # text & voice are only created once the category exists
+                category = found.get("create_category")
+                channels = [] if category is None else (category.text_channels if step == "create_text_channel" else category.voice_channels)
+                obj = dget(channels, name=team_name)
+        else:
+            obj = None
+        if obj is not None:
+            found[step] = obj
+    return [found[step] for step in reversed(CREATE_STEPS) if step in found]
+
+
+async def roll_back(guild: discord.Guild, op: JournalOp, names: Optional[GuildIndex] = None) -> int:
+    '''Deletes what a team operation created: channels first, then the category, then the role. Returns how many were deleted.'''
+    deleted = 0
+    with priority(PROVISION):
+        for obj in _created(guild, op, names):
+            try:
+                await obj.delete(reason=f"Rolling back team {op.payload['team_name']}")
+                deleted += 1
+            except discord.NotFound:
+                pass
+    logging.info(f"journal: rolled back {op.payload['team_name']} ({deleted} object(s) deleted)")
+    return deleted
+
+
+async def reconcile(
+    journal: Journal,
+    client: discord.Client,
+    teams: TeamRegistry,
+    names: NameIndex,
+    staff_roles: Callable[[discord.Guild], Sequence[str]] = lambda guild: STAFF_ROLES,
+    members: Optional[MemberFetcher] = None,
+) -> Tuple[int, int]:
+    '''
+    Settles operations left incomplete by a crash. A team is finished if its members are all
+    still here and free; otherwise whatever was created for it is deleted. Operations this
+    process began (a `/team` answered before `on_ready`) are still running and are left
+    alone. Members that aren't
+    cached are looked up through `members` if given. Returns (finished, rolled back).
+    '''
+    finished = rolled_back = 0
+    for op in await journal.incomplete():
+        if op.op_id in journal.opened:
+            continue
+        guild = client.get_guild(op.payload.get("guild_id", 0))
+        if guild is None:
+            continue  # another shard's (or a guild we've left)
+        if op.kind != "team":
+            await journal.close(op.op_id)
+            continue
+
+        team_name = op.payload["team_name"]
+        if teams.get(guild.id, team_name) is not None:
+            # crashed after registering the team; nothing left to do
+            await journal.close(op.op_id)
+            continue
+
+        member_ids = op.payload["member_ids"]
+        found = await members.get_many(guild, member_ids) if members is not None else {}
+        team_members = [guild.get_member(member_id) or found.get(member_id) for member_id in member_ids]
+        valid = all(member is not None for member in team_members) and teams.reserve(guild.id, team_name, member_ids)
+        try:
+            if valid:
+                result = await provision_team(
+                    guild, team_name, team_members, staff_roles=staff_roles(guild), names=names.get(guild),
+                    done=op.done if op.started else None,  # nothing was sent yet: nothing to look for
+                    on_step=lambda step, object_id, op_id=op.op_id: journal.finished(op_id, step, object_id),
+                    on_wave=lambda steps, op_id=op.op_id: journal.started(op_id, steps),
+                )
+                await teams.add(
+                    guild.id, team_name, [m.id for m in team_members],
+                    role_id=result.role.id,
+                    category_id=result.category.id,
+                    text_channel_id=result.text.id,
+                    voice_channel_id=result.voice.id,
+                )
+                finished += 1
+                logging.info(f"journal: finished provisioning {team_name} after a restart")
+            else:
+                await roll_back(guild, op, names.get(guild))
+                rolled_back += 1
+        except discord.HTTPException:
+            logging.exception(f"journal: could not reconcile {team_name}; will retry on next start")
+            continue
+        finally:
+            if valid:
+                teams.release(guild.id, team_name)
+        await journal.close(op.op_id)
+    return finished, rolled_back
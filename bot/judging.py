@@ -0,0 +1,52 @@
+import logging
+
+from .storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    team_name TEXT NOT NULL,
+    devpost TEXT,
+    github TEXT,
+    PRIMARY KEY (guild_id, team_name)
+);
+"""
+
+# Submissions from before the table had a guild_id are moved to the guild of the team
+# with that name; any whose team isn't registered anywhere keep guild_id 0 until
+# `claim_legacy` hands them to the deployment's original guild once it's connected.
+MIGRATE_GUILD_ID = """
+BEGIN;
+ALTER TABLE submissions RENAME TO submissions_old;
+CREATE TABLE submissions (
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    team_name TEXT NOT NULL,
+    devpost TEXT,
+    github TEXT,
+    PRIMARY KEY (guild_id, team_name)
+);
+INSERT OR REPLACE INTO submissions (guild_id, team_name, devpost, github)
+    SELECT COALESCE((SELECT t.guild_id FROM teams t WHERE t.team_name = s.team_name LIMIT 1), 0), s.team_name, s.devpost, s.github
+    FROM submissions_old s;
+DROP TABLE submissions_old;
+COMMIT;
+"""
+
+
+async def migrate(db: Storage) -> None:
+    '''Creates the submissions table, or adds guild_id to one from a single-guild deployment. Needs the teams table.'''
+    columns = [row[1] for row in await db.fetchall("PRAGMA table_info(submissions)")]
+    if not columns:
+        await db.executescript(SCHEMA)
+    elif "guild_id" not in columns:
+        await db.executescript(MIGRATE_GUILD_ID)
+        logging.info("judging: added guild_id to submissions")
+
+
+async def claim_legacy(db: Storage, guild_id: int) -> int:
+    '''Moves submissions still at guild_id 0 to `guild_id`. Returns how many moved; clashes with the guild's own rows stay put.'''
+    moved = await db.execute("UPDATE OR IGNORE submissions SET guild_id = ? WHERE guild_id = 0", (guild_id,))
+    left = await db.fetchone("SELECT COUNT(*) FROM submissions WHERE guild_id = 0")
+    if left[0]:
+        logging.warning(f"judging: {left[0]} legacy submission(s) clash with guild {guild_id}'s own and were left unassigned")
+    return moved
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import discord
+
+# the most user ids one gateway member request may ask for
+QUERY_LIMIT = 100
+
+
+def lean_intents() -> discord.Intents:
+    '''Just what the bot uses: guild structure, member role changes, reactions and prefix commands.'''
+    intents = discord.Intents.none()
+    intents.guilds = True  # channels & roles, for the name index
+    intents.members = True  # role updates on members we hold, and member requests by id
+    intents.guild_reactions = True  # the welcome message and ✅/❌ confirmations
+    intents.guild_messages = True
+    intents.message_content = True  # `~` commands
+    return intents
+
+
+class MemberFetcher:
+    '''
+    Looks up members that aren't cached, batching the misses.
+
+    Lookups that arrive within `window` seconds of each other (or until `QUERY_LIMIT` ids
+    are waiting) go out as one gateway member request per guild instead of one REST call
+    each. Whatever is found is cached, so with a lean member cache the cache ends up holding
+    the members the bot has actually needed: participants and team members.
+    '''
+
+    def __init__(self, window: float = 0.05) -> None:
+        self.window = window
+        self._waiting: Dict[int, Dict[int, List[asyncio.Future]]] = {}  # guild id -> member id -> lookups
+        self._flushes: Dict[int, asyncio.TimerHandle] = {}
+
+        self.requests = 0
+        self.fetched = 0
+        self.not_found = 0
+
+    async def get(self, guild: discord.Guild, member_id: int) -> Optional[discord.Member]:
+        '''The member, from the cache or the gateway; None if they aren't in the guild.'''
+        member = guild.get_member(member_id)
+        if member is not None:
+            return member
+        future = asyncio.get_running_loop().create_future()
+        waiting = self._waiting.setdefault(guild.id, {})
+        waiting.setdefault(member_id, []).append(future)
+        if len(waiting) >= QUERY_LIMIT:
+            self._flush_now(guild)
+        elif guild.id not in self._flushes:
+            self._flushes[guild.id] = asyncio.get_running_loop().call_later(self.window, self._flush_now, guild)
+        return await future
+
+    async def get_many(self, guild: discord.Guild, member_ids: Iterable[int]) -> Dict[int, discord.Member]:
+        '''Member id -> member for the ids that are in the guild.'''
+        member_ids = list(dict.fromkeys(member_ids))
+        found = await asyncio.gather(*[self.get(guild, member_id) for member_id in member_ids])
+        return {member_id: member for member_id, member in zip(member_ids, found) if member is not None}
+
+    def _flush_now(self, guild: discord.Guild) -> None:
+        handle = self._flushes.pop(guild.id, None)
+        if handle is not None:
+            handle.cancel()
+        waiting = self._waiting.pop(guild.id, None)
+        if waiting:
+            asyncio.create_task(self._query(guild, waiting), name=f"member-fetch-{guild.id}")
+
+    async def _query(self, guild: discord.Guild, waiting: Dict[int, List[asyncio.Future]]) -> None:
+        member_ids = list(waiting)
+        for i in range(0, len(member_ids), QUERY_LIMIT):
+            batch = member_ids[i:i + QUERY_LIMIT]
+            try:
+                self.requests += 1
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+            except Exception as e:
+                logging.warning(f"members: lookup of {len(batch)} member(s) in {guild.name} failed: {e!r}")
+                for member_id in batch:
+                    for future in waiting[member_id]:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+            by_id = {member.id: member for member in members}
+            self.fetched += len(by_id)
+            self.not_found += len(batch) - len(by_id)
+            for member_id in batch:
+                for future in waiting[member_id]:
+                    if not future.done():
+                        future.set_result(by_id.get(member_id))
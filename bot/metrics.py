@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from aiohttp import web
+
+# seconds; covers everything from a cached lookup to a rate-limited REST call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_SNOWFLAKE = re.compile(r"/\d{15,}")
+_TOKEN = re.compile(r"/(interactions|webhooks)/\{id\}/[^/]+")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    '''A gauge that is either set directly or read from `func` at scrape time.'''
+
+    def __init__(self, name: str, help: str, func: Optional[Callable[[], float]] = None) -> None:
+        self.name = name
+        self.help = help
+        self.func = func
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> List[str]:
+        value = self.value
+        if self.func is not None:
+            try:
+                value = self.func()
+            except Exception:
+                logging.exception(f"metrics: gauge {self.name} failed")
+                value = float("nan")
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            names = self.label_names + ("le",)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+def route_of(method: str, path: str) -> str:
+    '''`/api/v10/channels/123.../messages` -> `POST /channels/{id}/messages`; tokens are masked too.'''
+    path = path.split("/api/v10", 1)[-1]
+    path = _SNOWFLAKE.sub("/{id}", path)
+    path = _TOKEN.sub(r"/\1/{id}/{token}", path)
+    return f"{method} {path}"
+
+
+class Metrics:
+    '''
+    In-process metrics for the bot, rendered in Prometheus text format on demand.
+
+    Recording is a dict lookup and a couple of increments, and nothing is formatted
+    until something scrapes `/metrics`, so it costs next to nothing when nobody is watching.
+    '''
+
+    def __init__(self) -> None:
+        self.command_latency = Histogram("hackedbot_command_seconds", "Command latency.", ("kind", "command", "outcome"))
+        self.interaction_delay = Histogram("hackedbot_interaction_delay_seconds", "Time from Discord creating an interaction to its command starting.")
+        self.rest_latency = Histogram("hackedbot_rest_request_seconds", "Discord REST request latency.", ("route",))
+        self.rest_requests = Counter("hackedbot_rest_requests_total", "Discord REST requests by route and status.", ("route", "status"))
+        self.rest_rate_limited = Counter("hackedbot_rest_rate_limited_total", "Discord REST 429 responses by route.", ("route",))
+        self.loop_lag = Histogram("hackedbot_event_loop_lag_seconds", "How late the event loop ran a timer.")
+        self.loop_lag_last = Gauge("hackedbot_event_loop_lag_last_seconds", "Most recent event loop lag sample.")
+        self.db_latency = Histogram("hackedbot_db_seconds", "SQLite query latency, including time queued.", ("kind",))
+        self.gauges: List[Gauge] = [self.loop_lag_last]
+        self._metrics = [
+            self.command_latency, self.interaction_delay, self.rest_latency, self.rest_requests, self.rest_rate_limited,
+            self.loop_lag, self.db_latency,
+        ]
+        self._lag_task: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def gauge(self, name: str, help: str, func: Callable[[], float]) -> Gauge:
+        gauge = Gauge(name, help, func)
+        self.gauges.append(gauge)
+        return gauge
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics + self.gauges:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    # ===== REST, via aiohttp tracing on discord.py's session
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(start=0.0))
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            route = route_of(params.method, params.url.path)
+            self.rest_latency.observe(time.perf_counter() - ctx.start, route)
+            self.rest_requests.inc(route, str(params.response.status))
+            if params.response.status == 429:
+                self.rest_rate_limited.inc(route)
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    # ===== event loop lag
+
+    async def _watch_loop(self, interval: float) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(time.perf_counter() - start - interval, 0.0)
+            self.loop_lag.observe(lag)
+            self.loop_lag_last.set(lag)
+
+    # ===== lifecycle
+
+    async def start(self, port: Optional[int] = None, host: str = "127.0.0.1", lag_interval: float = 0.5) -> None:
+        '''Starts sampling loop lag and, if `port` is given, serves `/metrics` there.'''
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._watch_loop(lag_interval), name="metrics-loop-lag")
+        if port and self._runner is None:
+            app = web.Application()
+            app.router.add_get("/metrics", self._scrape)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, host, port).start()
+            print(f"Metrics available at http://{host}:{port}/metrics")
+
+    async def stop(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _scrape(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
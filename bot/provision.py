@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Sequence
+
+import discord
+from discord.utils import get as dget
+
+from .index import GuildIndex
+from .scheduler import PROVISION, priority
+
+# Roles that can see every team category
+STAFF_ROLES = ['organizer', 'mentor', 'volunteer', 'sponsor', 'judge']
+TEAM_COLOUR = "#adadad"
+
+
+class ProvisionResult:
+    '''
+    Everything created for a team, plus how long each step took (in seconds).
+    '''
+
+    def __init__(self, team_name: str) -> None:
+        self.team_name = team_name
+        self.role: Optional[discord.Role] = None
+        self.category: Optional[discord.CategoryChannel] = None
+        self.text: Optional[discord.TextChannel] = None
+        self.voice: Optional[discord.VoiceChannel] = None
+        self.timings: Dict[str, float] = {}
+        self.waves: List[float] = []
+        self.requests = 0
+
+    @property
+    def total(self) -> float:
+        return sum(self.waves)
+
+    def summary(self) -> str:
+        steps = ", ".join(f"{step}={secs * 1000:.0f}ms" for step, secs in self.timings.items())
+        return f"{self.requests} requests in {len(self.waves)} waves, {self.total * 1000:.0f}ms total ({steps})"
+
+
+# step name -> id of what it created (0 for steps that don't create anything)
+OnStep = Callable[[str, int], Awaitable[None]]
+# names of the steps about to be sent together
+OnWave = Callable[[List[str]], Awaitable[None]]
+
+
+async def _timed(result: ProvisionResult, step: str, coro, on_step: Optional[OnStep] = None):
+    start = time.perf_counter()
+    try:
+        created = await coro
+    finally:
+        result.timings[step] = time.perf_counter() - start
+        result.requests += 1
+    if on_step is not None:
+        await on_step(step, getattr(created, "id", 0))
+    return created
+
+
+async def _wave(result: ProvisionResult, steps: Dict[str, Awaitable], on_step: Optional[OnStep] = None, on_wave: Optional[OnWave] = None) -> Dict[str, object]:
+    if not steps:
+        return {}
+    if on_wave is not None:
+        await on_wave(list(steps))
+    start = time.perf_counter()
+    try:
+        # every step runs to the end, even if one fails, so whatever was created has been
+        # reported to on_step by the time the error reaches a roll back
+        created = await asyncio.gather(*[_timed(result, step, coro, on_step) for step, coro in steps.items()], return_exceptions=True)
+    finally:
+        result.waves.append(time.perf_counter() - start)
+    for outcome in created:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return dict(zip(steps, created))
+
+
+def staff_overwrites(
+    guild: discord.Guild,
+    staff_roles: Sequence[str] = STAFF_ROLES,
+    names: Optional[GuildIndex] = None,
+) -> Dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
+    '''Private-category overwrites: @everyone can't view, staff can.'''
+    overwrites = {guild.default_role: discord.PermissionOverwrite(read_messages=False)}
+    for role_name in staff_roles:
+        role = names.role(role_name) if names is not None else dget(guild.roles, name=role_name)
+        if role is None:
+            logging.warning(f"provision: staff role `{role_name}` not found, skipping its overwrite")
+            continue
+        overwrites[role] = discord.PermissionOverwrite(read_messages=True)
+    return overwrites
+
+
+async def provision_team(
+    guild: discord.Guild,
+    team_name: str,
+    members: Sequence[discord.Member],
+    staff_roles: Sequence[str] = STAFF_ROLES,
+    names: Optional[GuildIndex] = None,
+    done: Optional[Mapping[str, int]] = None,
+    on_step: Optional[OnStep] = None,
+    on_wave: Optional[OnWave] = None,
+) -> ProvisionResult:
+    '''
+    Creates a team's role, private category, text & voice channels, and gives the role to every member.
+
+    Permission overwrites are sent with the create calls instead of one `set_permissions`
+    per role, and independent steps run concurrently:
+
+    1. role + category (with @everyone/staff overwrites)
+    2. team overwrite on the category, text + voice channels (with full overwrites), member role adds
+    3. welcome message in the text channel
+
+    To resume a team that was only partly provisioned, pass the steps already `done` (as
+    reported to `on_step`); whatever they created that still exists is reused, not recreated.
+    A step that was in flight when we stopped is found by name instead. `on_wave` is awaited
+    with the names of each wave's steps before they're sent, so they can be logged ahead.
+    '''
+    result = ProvisionResult(team_name)
+    overwrites = staff_overwrites(guild, staff_roles, names)
+    resuming = done is not None
+    done = done or {}
+
+    def existing(step: str, lookup, find):
+        if done.get(step):
+            return lookup(done[step])
+        return find(team_name) if resuming else None
+
+    def scan(objs):
+        return lambda name: dget(objs, name=name)
+
+    with priority(PROVISION):
+        # the guild-wide look-ups go through the name index when there is one
+        result.role = existing("create_role", guild.get_role, names.role if names is not None else scan(guild.roles))
+        result.category = existing("create_category", guild.get_channel, names.category if names is not None else scan(guild.categories))
+        steps = {}
+        if result.role is None:
+            steps["create_role"] = guild.create_role(name=team_name, mentionable=True, colour=discord.Colour.from_str(TEAM_COLOUR))
+        if result.category is None:
+            steps["create_category"] = guild.create_category(name=team_name, overwrites=overwrites)
+        created = await _wave(result, steps, on_step, on_wave)
+        result.role = created.get("create_role", result.role)
+        result.category = created.get("create_category", result.category)
+
+        team_overwrites = dict(overwrites)
+        team_overwrites[result.role] = discord.PermissionOverwrite(read_messages=True)
+
+        result.text = existing("create_text_channel", guild.get_channel, scan(result.category.text_channels))
+        result.voice = existing("create_voice_channel", guild.get_channel, scan(result.category.voice_channels))
+        steps = {}
+        if created or "category_permissions" not in done:
+            steps["category_permissions"] = result.category.set_permissions(result.role, read_messages=True)
+        if result.text is None:
+            steps["create_text_channel"] = guild.create_text_channel(name=team_name, category=result.category, overwrites=team_overwrites)
+        if result.voice is None:
+            steps["create_voice_channel"] = guild.create_voice_channel(name=team_name, category=result.category, overwrites=team_overwrites)
+        for member in members:
+            if result.role not in member.roles:
+                steps[f"add_role:{member.id}"] = member.add_roles(result.role)
+        created = await _wave(result, steps, on_step, on_wave)
+        result.text = created.get("create_text_channel", result.text)
+        result.voice = created.get("create_voice_channel", result.voice)
+
+        if "welcome" not in done:
+            await _wave(result, {
+                "welcome": result.text.send(f'Hey {" ".join([member.mention for member in members])}! Here is your team category & channels.'),
+            }, on_step, on_wave)
+
+    logging.info(f"provision: {team_name}: {result.summary()}")
+    return result
@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Awaitable, Callable, Collection, List, Optional, Set
+
+import discord
+
+BULK_LIMIT = 100
+# Discord refuses bulk deletes of messages older than 14 days; leave a margin for clock skew
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+
+class PurgeJob:
+    '''
+    Deletes a channel's history as it streams in, instead of collecting it first.
+
+    Messages young enough for bulk delete go out in batches of 100 per request. Older
+    ones go through a lane of at most `old_concurrency` single deletes at a time; the
+    HTTP client already queues those on the per-channel delete bucket, so the lane just
+    keeps us from piling hundreds of requests onto it. `progress` is awaited every
+    `progress_every` seconds, and cancelling the task running `run()` stops the purge.
+    '''
+
+    def __init__(
+        self,
+        channel: discord.TextChannel,
+        *,
+        author: Optional[discord.abc.Snowflake] = None,
+        before: Optional[discord.abc.Snowflake] = None,
+        after: Optional[discord.abc.Snowflake] = None,
+        keep_pinned: bool = False,
+        skip: Collection[int] = (),
+        watch: Collection[int] = (),
+        old_concurrency: int = 3,
+        progress: Optional[Callable[["PurgeJob"], Awaitable[None]]] = None,
+        progress_every: float = 5.0,
+    ) -> None:
+        self.channel = channel
+        self.author = author
+        self.before = before
+        self.after = after
+        self.keep_pinned = keep_pinned
+        self.skip = set(skip)
+        self.watch = set(watch)
+        self.progress = progress
+        self.progress_every = progress_every
+        self._old_lane = asyncio.Semaphore(old_concurrency)
+        self._old_tasks: Set[asyncio.Task] = set()
+
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+        self.watched_deleted: Set[int] = set()  # ids from `watch` that were deleted
+        self.started_at = time.perf_counter()
+        self._last_progress = self.started_at
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def wanted(self, message: discord.Message) -> bool:
+        if message.id in self.skip:
+            return False
+        if self.keep_pinned and message.pinned:
+            return False
+        if self.author is not None and message.author.id != self.author.id:
+            return False
+        return True
+
+    async def run(self) -> int:
+        '''Runs the purge to completion. Returns the number of messages deleted.'''
+        cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        batch: List[discord.Message] = []
+        try:
+            async for message in self.channel.history(limit=None, before=self.before, after=self.after):
+                self.scanned += 1
+                if not self.wanted(message):
+                    continue
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == BULK_LIMIT:
+                        await self._delete_bulk(batch)
+                        batch = []
+                else:
+                    await self._delete_old(message)
+                await self._report()
+            if batch:
+                await self._delete_bulk(batch)
+            if self._old_tasks:
+                await asyncio.gather(*self._old_tasks)
+        finally:
+            for task in self._old_tasks:
+                task.cancel()
+        logging.info(f"purge: #{self.channel.name}: deleted {self.deleted}/{self.scanned} scanned in {self.elapsed:.1f}s ({self.failed} failed)")
+        return self.deleted
+
+    async def _report(self) -> None:
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_progress >= self.progress_every:
+            self._last_progress = now
+            await self.progress(self)
+
+    def _deleted(self, messages: List[discord.Message]) -> None:
+        self.deleted += len(messages)
+        if self.watch:
+            self.watched_deleted.update(m.id for m in messages if m.id in self.watch)
+
+    async def _delete_bulk(self, batch: List[discord.Message]) -> None:
+        try:
+            # one message falls back to a single delete inside delete_messages
+            await self.channel.delete_messages(batch)
+            self._deleted(batch)
+        except discord.NotFound:
+            # someone else deleted one of them; bulk delete fails as a whole, so retry one by one
+            for message in batch:
+                await self._delete_old(message)
+        except discord.HTTPException:
+            self.failed += len(batch)
+            logging.exception(f"purge: bulk delete of {len(batch)} messages failed")
+
+    async def _delete_old(self, message: discord.Message) -> None:
+        await self._old_lane.acquire()
+        task = asyncio.create_task(self._delete_one(message))
+        self._old_tasks.add(task)
+        task.add_done_callback(self._old_tasks.discard)
+
+    async def _delete_one(self, message: discord.Message) -> None:
+        try:
+            await message.delete()
+            self._deleted([message])
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            self.failed += 1
+        finally:
+            self._old_lane.release()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import discord
+
+from .members import QUERY_LIMIT, MemberFetcher
+from .scheduler import BULK, priority
+
+
+class RoleGrantWorker:
+    '''
+    Grants the participant role from a queue instead of inline in the reaction handler.
+
+    - pending (guild, member) pairs are deduplicated, and members who already hold the role are skipped
+    - each guild has its own queue, drained at no more than `rate` per second (Discord limits
+      member role changes per guild), so a doors-open burst doesn't run into 429s or hold up
+      grants in other guilds
+    - `backfill` pages through a message's ✅ reactions to pick up anything missed while offline
+    - with a `members` fetcher, uncached members are looked up along with the rest of the
+      guild's queue, up to 100 per gateway request, instead of one REST call each
+    '''
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        role_for: Callable[[discord.Guild], Optional[discord.Role]],
+        rate: float = 5.0,
+        members: Optional[MemberFetcher] = None,
+    ) -> None:
+        self.bot = bot
+        self.role_for = role_for
+        self.members = members
+        self.interval = 1.0 / rate
+        self._queues: Dict[int, Deque[int]] = {}  # guild id -> member ids waiting, oldest first
+        self._workers: Dict[int, asyncio.Task] = {}  # guild id -> task draining its queue
+        self._running = False
+        self._pending: Dict[Tuple[int, int], float] = {}  # (guild id, member id) -> time queued
+        self._given: Dict[Tuple[int, int], discord.Member] = {}  # members that came with their event, so need no lookup
+        self._backfilling = False
+
+        self.granted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.latencies: Deque[float] = deque(maxlen=1000)  # queued -> granted, seconds
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def latency(self, quantile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def start(self) -> None:
+        self._running = True
+        for guild_id in list(self._queues):
+            self._wake(guild_id)
+
+    async def stop(self) -> None:
+        self._running = False
+        workers = list(self._workers.values())
+        self._workers.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def enqueue(self, guild_id: int, member_id: int, member: Optional[discord.Member] = None) -> bool:
+        '''Queues a grant, with the member if the event carried it. Returns False if that member is already waiting.'''
+        key = (guild_id, member_id)
+        if key in self._pending:
+            return False
+        self._pending[key] = time.perf_counter()
+        if member is not None:
+            self._given[key] = member
+        self._queues.setdefault(guild_id, deque()).append(member_id)
+        self._wake(guild_id)
+        return True
+
+    def _wake(self, guild_id: int) -> None:
+        if self._running and guild_id not in self._workers:
+            with priority(BULK):  # grants yield to replies and provisioning
+                self._workers[guild_id] = asyncio.create_task(self._run(guild_id), name=f"role-grants-{guild_id}")
+
+    async def _run(self, guild_id: int) -> None:
+        '''Drains one guild's queue, then exits; the next `enqueue` for the guild starts another.'''
+        queue = self._queues[guild_id]
+        try:
+            while queue:
+                member_id = queue.popleft()
+                key = (guild_id, member_id)
+                queued_at = self._pending.get(key, time.perf_counter())
+                given = self._given.pop(key, None)
+                try:
+                    if await self._grant(guild_id, member_id, given):
+                        self.latencies.append(time.perf_counter() - queued_at)
+                        await asyncio.sleep(self.interval)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.failed += 1
+                    logging.exception(f"reactions: failed to grant role to member {member_id}")
+                finally:
+                    self._pending.pop(key, None)
+        finally:
+            if self._workers.get(guild_id) is asyncio.current_task():
+                del self._workers[guild_id]
+            if not queue:
+                self._queues.pop(guild_id, None)
+
+    async def _grant(self, guild_id: int, member_id: int, given: Optional[discord.Member] = None) -> bool:
+        '''Returns True if a REST call was made.'''
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return False
+        role = self.role_for(guild)
+        if role is None:
+            return False
+        member = guild.get_member(member_id) or given
+        if member is None and self.members is not None:
+            queued = [
+                m for m in self._queues.get(guild_id, ())
+                if (guild_id, m) not in self._given and guild.get_member(m) is None
+            ]
+            member = (await self.members.get_many(guild, [member_id] + queued[:QUERY_LIMIT - 1])).get(member_id)
+            if member is None:
+                return False  # left the guild
+        elif member is None:
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.NotFound:
+                return True
+        if member.bot or role in member.roles:
+            self.skipped += 1
+            return False
+        await member.add_roles(role)
+        self.granted += 1
+        print(f"Added role {role.name} to {member.name}")
+        return True
+
+    async def backfill(self, channel: discord.abc.Messageable, message_id: int, emoji: str = "✅") -> int:
+        '''Queues everyone who reacted with `emoji` on the message. Returns how many were queued.'''
+        if self._backfilling:
+            return 0
+        self._backfilling = True
+        queued = 0
+        try:
+            message = await channel.fetch_message(message_id)
+            for reaction in message.reactions:
+                if str(reaction.emoji) != emoji:
+                    continue
+                role = self.role_for(message.guild)
+                # users() pages through the reactors 100 at a time
+                async for user in reaction.users(limit=None):
+                    member = message.guild.get_member(user.id)
+                    if user.bot or (member is not None and role in member.roles):
+                        continue
+                    if self.enqueue(message.guild.id, user.id):
+                        queued += 1
+        finally:
+            self._backfilling = False
+        logging.info(f"reactions: backfill queued {queued} grant(s) from message {message_id}")
+        return queued
@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+import discord
+
+# Discord limits
+MESSAGE_LIMIT = 2000
+EMBEDS_PER_MESSAGE = 10
+EMBED_TOTAL_LIMIT = 6000
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_FIELD_LIMIT = 1024
+
+
+def clip(text: str, limit: int) -> str:
+    '''Cuts `text` down to `limit` characters, marking the cut with an ellipsis.'''
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class TextPacker:
+    '''
+    Packs entries into as few messages as possible without splitting an entry,
+    unless that entry alone is over the message limit.
+    '''
+
+    def __init__(self, limit: int = MESSAGE_LIMIT) -> None:
+        self.limit = limit
+        self._parts: List[str] = []
+        self._size = 0
+
+    def add(self, entry: str) -> Iterator[str]:
+        '''Adds an entry, yielding any messages that are now full.'''
+        if self._size + len(entry) > self.limit and self._parts:
+            yield self.flush()
+        while len(entry) > self.limit:
+            yield entry[:self.limit]
+            entry = entry[self.limit:]
+        self._parts.append(entry)
+        self._size += len(entry)
+
+    def flush(self) -> Optional[str]:
+        if not self._parts:
+            return None
+        message = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        return message
+
+
+class EmbedPacker:
+    '''Groups embeds into messages of up to 10 embeds and 6,000 characters.'''
+
+    def __init__(self) -> None:
+        self._embeds: List[discord.Embed] = []
+        self._size = 0
+
+    def add(self, embed: discord.Embed) -> Iterator[List[discord.Embed]]:
+        size = len(embed)
+        if self._embeds and (len(self._embeds) == EMBEDS_PER_MESSAGE or self._size + size > EMBED_TOTAL_LIMIT):
+            yield self.flush()
+        self._embeds.append(embed)
+        self._size += size
+
+    def flush(self) -> Optional[List[discord.Embed]]:
+        if not self._embeds:
+            return None
+        embeds = self._embeds
+        self._embeds = []
+        self._size = 0
+        return embeds
+
+
+def pack_embeds(embeds: Sequence[discord.Embed]) -> List[List[discord.Embed]]:
+    packer = EmbedPacker()
+    messages = []
+    for embed in embeds:
+        messages.extend(packer.add(embed))
+    last = packer.flush()
+    if last:
+        messages.append(last)
+    return messages
+
+
+async def send_text(destination: discord.abc.Messageable, entries: AsyncIterator[str], limit: int = MESSAGE_LIMIT) -> int:
+    '''
+    Streams entries into packed messages, sending each one as soon as it fills up.
+    Link previews are suppressed at send time. Returns the number of messages sent.
+    '''
+    packer = TextPacker(limit)
+    sent = 0
+    async for entry in entries:
+        for message in packer.add(entry):
+            await destination.send(message, suppress_embeds=True)
+            sent += 1
+    message = packer.flush()
+    if message:
+        await destination.send(message, suppress_embeds=True)
+        sent += 1
+    return sent
+
+
+async def send_embeds(destination: discord.abc.Messageable, embeds: AsyncIterator[discord.Embed]) -> int:
+    '''Streams embeds into messages of up to 10 each. Returns the number of messages sent.'''
+    packer = EmbedPacker()
+    sent = 0
+    async for embed in embeds:
+        for batch in packer.add(embed):
+            await destination.send(embeds=batch)
+            sent += 1
+    batch = packer.flush()
+    if batch:
+        await destination.send(embeds=batch)
+        sent += 1
+    return sent
+
+
+def export_file(rows: Sequence[Dict[str, str]], fmt: str, filename: str) -> discord.File:
+    '''Renders `rows` as a single CSV or JSON attachment.'''
+    if fmt == "json":
+        data = json.dumps(list(rows), indent=2).encode()
+    elif fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+        data = buffer.getvalue().encode()
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+    return discord.File(io.BytesIO(data), filename=f"{filename}.{fmt}")
@@ -0,0 +1,311 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import discord
+
+from .index import GuildIndex
+from .journal import CREATE_STEPS, JournalOp, roll_back
+from .members import MemberFetcher
+from .provision import STAFF_ROLES, provision_team
+from .storage import Storage
+from .teams import TeamRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS provision_jobs (
+    guild_id INTEGER NOT NULL,
+    team_name TEXT NOT NULL,
+    member_ids TEXT NOT NULL,
+    steps TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (guild_id, team_name)
+);
+"""
+# `steps` is the JSON {step: id} reported by provision_team (plus `begin` once the team has started);
+# `status` is pending, done or failed. Failed jobs wait for `~import_teams retry` or `cancel`
+
+TEAM_NAME = re.compile(r"^([a-z0-9]+-)*[a-z0-9]+$")  # something that can be a discord text channel
+MENTION = re.compile(r"^<@!?(\d+)>$")
+
+
+class RosterEntry:
+    __slots__ = ("line", "team_name", "member_ids")
+
+    def __init__(self, line: int, team_name: str, member_ids: List[int]) -> None:
+        self.line = line
+        self.team_name = team_name
+        self.member_ids = member_ids
+
+
+def _member_id(value) -> int:
+    value = str(value).strip()
+    match = MENTION.match(value)
+    return int(match.group(1) if match else value)
+
+
+def parse_roster(data: bytes, filename: str) -> List[RosterEntry]:
+    '''
+    Reads teams from a `.json` file (`[{"team_name": ..., "members": [ids]}, ...]`) or a CSV
+    with one team per line (`team_name,member_id,member_id,...`; a header line is skipped).
+    Raises ValueError on anything malformed.
+    '''
+    text = data.decode("utf-8-sig")
+    entries = []
+    if filename.lower().endswith(".json"):
+        try:
+            teams = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}")
+        if isinstance(teams, dict):
+            teams = teams.get("teams", [])
+        for i, team in enumerate(teams, start=1):
+            try:
+                entries.append(RosterEntry(i, str(team["team_name"]).strip(), [_member_id(m) for m in team.get("members", [])]))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"team {i}: expected {{\"team_name\": ..., \"members\": [ids]}}")
+    else:
+        for line, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+            cells = [cell.strip() for cell in row if cell.strip()]
+            if not cells or (line == 1 and cells[0].lower() in ("team_name", "team")):
+                continue
+            try:
+                entries.append(RosterEntry(line, cells[0], [_member_id(cell) for cell in cells[1:]]))
+            except ValueError:
+                raise ValueError(f"line {line}: member ids must be numbers or mentions")
+    return entries
+
+
+def validate_roster(
+    guild: discord.Guild,
+    entries: List[RosterEntry],
+    names: GuildIndex,
+    teams: TeamRegistry,
+    resumable: Dict[str, List[int]],
+    participant_role: str = "participant",
+) -> Tuple[List[RosterEntry], List[str]]:
+    '''
+    Checks every entry against the guild in one pass, returning the valid entries and a
+    line per problem. `resumable` (team name -> member ids) holds unfinished imports: their
+    names may already exist in the guild, and their members are spoken for. Members need
+    the participant role, as they do for `/team`.
+    '''
+    errors = []
+    seen_names: Set[str] = set()
+    claimed: Dict[int, str] = {member_id: name for name, member_ids in resumable.items() for member_id in member_ids}
+    for entry in entries:
+        where = f"line {entry.line} (`{entry.team_name}`)"
+        name = entry.team_name
+        if len(name) > 100:
+            errors.append(f"{where}: team name is longer than 100 characters")
+        elif not TEAM_NAME.search(name):
+            errors.append(f"{where}: team name may only use lowercase letters and digits separated by dashes")
+        elif name in seen_names:
+            errors.append(f"{where}: team appears more than once")
+        elif name not in resumable and names.name_taken(name):
+            errors.append(f"{where}: the name is already taken in this server")
+        seen_names.add(name)
+
+        if not entry.member_ids:
+            errors.append(f"{where}: team has no members")
+        for member_id in entry.member_ids:
+            member = guild.get_member(member_id)
+            if member is None:
+                errors.append(f"{where}: <@{member_id}> is not in this server")
+            elif member.bot:
+                errors.append(f"{where}: {member.mention} is a bot")
+            elif not any(role.name == participant_role for role in member.roles):
+                errors.append(f"{where}: {member.mention} does not have the `@{participant_role}` role")
+            elif teams.team_of(guild.id, member_id):
+                errors.append(f"{where}: {member.mention} is already on team `{teams.team_of(guild.id, member_id).name}`")
+            elif claimed.get(member_id, name) != name:
+                errors.append(f"{where}: {member.mention} is also listed for `{claimed[member_id]}`")
+            claimed.setdefault(member_id, name)
+
+    if errors:
+        return [], errors
+    return entries, []
+
+
+class RosterImport:
+    '''
+    Provisions a guild's imported teams, a few at a time.
+
+    Each team is a row in `provision_jobs`, and every step provision_team completes is
+    checkpointed there before the next wave starts. Re-running picks up the teams that
+    aren't done, reusing whatever they had already created.
+    '''
+
+    def __init__(
+        self,
+        guild: discord.Guild,
+        db: Storage,
+        teams: TeamRegistry,
+        names: Optional[GuildIndex] = None,
+        staff_roles: Sequence[str] = STAFF_ROLES,
+        concurrency: int = 3,
+        progress: Optional[Callable[["RosterImport"], Awaitable[None]]] = None,
+        progress_every: float = 5.0,
+        members: Optional[MemberFetcher] = None,
+    ) -> None:
+        self.guild = guild
+        self.db = db
+        self.teams = teams
+        self.names = names
+        self.staff_roles = staff_roles
+        self.concurrency = concurrency
+        self.progress = progress
+        self.progress_every = progress_every
+        self.members = members
+
+        self.total = 0
+        self.done = 0
+        self.failed: Dict[str, str] = {}  # team name -> error
+        self.started_at = time.perf_counter()
+        self._reported_at = self.started_at
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @staticmethod
+    async def unfinished(db: Storage, guild_id: int) -> Dict[str, List[int]]:
+        '''Team name -> member ids for the guild's imports still waiting to run.'''
+        rows = await db.fetchall(
+            "SELECT team_name, member_ids FROM provision_jobs WHERE guild_id = ? AND status = 'pending'",
+            (guild_id,),
+        )
+        return {team_name: json.loads(member_ids) for team_name, member_ids in rows}
+
+    @staticmethod
+    async def failed_jobs(db: Storage, guild_id: int) -> Dict[str, str]:
+        '''Team name -> error for the guild's imports that failed. They stay put until retried or cancelled.'''
+        rows = await db.fetchall(
+            "SELECT team_name, error FROM provision_jobs WHERE guild_id = ? AND status = 'failed'",
+            (guild_id,),
+        )
+        return dict(rows)
+
+    @staticmethod
+    async def retry(db: Storage, guild_id: int, team_name: Optional[str] = None) -> int:
+        '''Puts failed imports (all, or just `team_name`) back to pending. Returns how many.'''
+        return await db.execute(
+            "UPDATE provision_jobs SET status = 'pending', error = NULL, updated_at = ? WHERE guild_id = ? AND status = 'failed' AND (? IS NULL OR team_name = ?)",
+            (time.time(), guild_id, team_name, team_name),
+        )
+
+    @staticmethod
+    async def cancel(db: Storage, guild: discord.Guild, team_name: Optional[str] = None, names: Optional[GuildIndex] = None) -> List[str]:
+        '''
+        Drops unfinished imports (all, or just `team_name`), deleting whatever they had
+        already created. Returns the names of the teams dropped.
+        '''
+        rows = await db.fetchall(
+            "SELECT team_name, steps FROM provision_jobs WHERE guild_id = ? AND status != 'done' AND (? IS NULL OR team_name = ?)",
+            (guild.id, team_name, team_name),
+        )
+        for name, steps in rows:
+            op = JournalOp("", "team", {"team_name": name})
+            op.done = json.loads(steps)
+            if op.done:
+                op.started = set(CREATE_STEPS)  # anything not checkpointed may have been in flight
+            await roll_back(guild, op, names)
+            await db.execute("DELETE FROM provision_jobs WHERE guild_id = ? AND team_name = ?", (guild.id, name))
+        return [name for name, _ in rows]
+
+    async def queue(self, entries: List[RosterEntry]) -> None:
+        '''Records the entries as pending jobs, keeping the progress of any that were already started.'''
+        now = time.time()
+        await self.db.executemany(
+            """
+            INSERT INTO provision_jobs (guild_id, team_name, member_ids, status, updated_at) VALUES (?, ?, ?, 'pending', ?)
+            ON CONFLICT (guild_id, team_name) DO UPDATE SET member_ids = excluded.member_ids, status = 'pending', error = NULL, updated_at = excluded.updated_at
+            WHERE status != 'done'
+            """,
+            [(self.guild.id, entry.team_name, json.dumps(entry.member_ids), now) for entry in entries],
+        )
+
+    async def run(self) -> int:
+        '''Provisions every pending team in the guild. Returns how many were completed.'''
+        jobs = await self.db.fetchall(
+            "SELECT team_name, member_ids, steps FROM provision_jobs WHERE guild_id = ? AND status = 'pending' ORDER BY updated_at",
+            (self.guild.id,),
+        )
+        self.total = len(jobs)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(team_name: str, member_ids: str, steps: str) -> None:
+            async with semaphore:
+                await self._provision(team_name, json.loads(member_ids), json.loads(steps))
+                await self._report()
+
+        await asyncio.gather(*[bounded(*job) for job in jobs])
+        logging.info(f"roster: {self.guild.name}: {self.done}/{self.total} team(s) provisioned in {self.elapsed:.1f}s ({len(self.failed)} failed)")
+        return self.done
+
+    async def _provision(self, team_name: str, member_ids: List[int], steps: Dict[str, int]) -> None:
+        async def checkpoint(step: str, created_id: int) -> None:
+            steps[step] = created_id
+            await self.db.execute(
+                "UPDATE provision_jobs SET steps = ?, updated_at = ? WHERE guild_id = ? AND team_name = ? AND status = 'pending'",
+                (json.dumps(steps), time.time(), self.guild.id, team_name),
+            )
+
+        if not self.teams.reserve(self.guild.id, team_name, member_ids):
+            self.failed[team_name] = "the name or a member was taken by another team"
+            await self._set_status(team_name, "failed", self.failed[team_name])
+            return
+        try:
+            if self.members is not None:
+                found = await self.members.get_many(self.guild, member_ids)
+                missing = [member_id for member_id in member_ids if member_id not in found]
+                if missing:
+                    raise ValueError(f"not in this server: {', '.join(f'<@{member_id}>' for member_id in missing)}")
+                members = [found[member_id] for member_id in member_ids]
+            else:
+                members = [self.guild.get_member(member_id) or await self.guild.fetch_member(member_id) for member_id in member_ids]
+            # a team that has never started can skip provision_team's look-ups by name; once
+            # `begin` is recorded, a restart knows something may have been in flight
+            done = dict(steps) if steps else None
+            if done is None:
+                await checkpoint("begin", 0)
+            result = await provision_team(self.guild, team_name, members, staff_roles=self.staff_roles, names=self.names, done=done, on_step=checkpoint)
+            await self.teams.add(
+                self.guild.id, team_name, member_ids,
+                role_id=result.role.id,
+                category_id=result.category.id,
+                text_channel_id=result.text.id,
+                voice_channel_id=result.voice.id,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.exception(f"roster: failed to provision {team_name}")
+            self.failed[team_name] = str(e) or type(e).__name__
+            await self._set_status(team_name, "failed", self.failed[team_name])
+            return
+        finally:
+            self.teams.release(self.guild.id, team_name)
+        self.done += 1
+        await self._set_status(team_name, "done")
+
+    async def _set_status(self, team_name: str, status: str, error: Optional[str] = None) -> None:
+        await self.db.execute(
+            # only a pending job moves on: a finished one never goes back to failed
+            "UPDATE provision_jobs SET status = ?, error = ?, updated_at = ? WHERE guild_id = ? AND team_name = ? AND status = 'pending'",
+            (status, error, time.time(), self.guild.id, team_name),
+        )
+
+    async def _report(self) -> None:
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if now - self._reported_at >= self.progress_every:
+            self._reported_at = now
+            await self.progress(self)
@@ -0,0 +1,149 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import time
+from typing import Deque, Dict, Iterator
+
+# Priority classes, most urgent first. Interaction callbacks and follow-ups go through
+# discord.py's webhook adapter rather than HTTPClient.request, so they never wait in this
+# scheduler (and Discord doesn't count them against the global limit); ACK exists so
+# anything else tagged that urgent skips the queue too.
+ACK, REPLY, PROVISION, BULK = range(4)
+CLASS_NAMES = {ACK: "ack", REPLY: "reply", PROVISION: "provision", BULK: "bulk"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("rest_priority", default=REPLY)
+
+
+@contextlib.contextmanager
+def priority(cls: int) -> Iterator[None]:
+    '''Tags REST calls made inside the block (and tasks started from it) with a priority class.'''
+    token = _priority.set(cls)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RestScheduler:
+    '''
+    Admission control in front of `HTTPClient.request`.
+
+    At most `max_in_flight` requests run at once, and no more than `rate` start per second,
+    which keeps us under Discord's global limit with headroom. When requests have to wait, the
+    next one is picked by weighted round robin over the classes, most urgent first: with the
+    default weights a busy REPLY class gets 8 slots for every 4 PROVISION and 1 BULK, so
+    background work keeps moving. Slots stay held while discord.py sleeps on a route bucket
+    or a 429, so PROVISION and BULK are also capped at `provision_in_flight` and
+    `bulk_in_flight` concurrent requests; the slots they can't take are left for replies.
+    '''
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        rate: float = 40.0,
+        weights: Dict[int, int] = None,
+        provision_in_flight: int = 4,
+        bulk_in_flight: int = 2,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.weights = weights or {REPLY: 8, PROVISION: 4, BULK: 1}
+        self.caps = {PROVISION: provision_in_flight, BULK: bulk_in_flight}
+        self._waiting: Dict[int, Deque[asyncio.Future]] = {cls: collections.deque() for cls in self.weights}
+        self._credits = dict(self.weights)
+        self._in_flight: Dict[int, int] = collections.Counter()
+        self._tokens = float(max_in_flight)
+        self._refilled = time.monotonic()
+        self._wakeup: asyncio.TimerHandle = None
+
+    # ===== introspection
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def depth(self, cls: int) -> int:
+        return len(self._waiting.get(cls, ()))
+
+    # ===== wrapping
+
+    def wrap(self, request):
+        '''Returns `request` (HTTPClient.request) routed through the scheduler.'''
+        async def scheduled(route, **kwargs):
+            cls = _priority.get()
+            if cls == ACK:
+                return await request(route, **kwargs)
+            await self.acquire(cls)
+            try:
+                return await request(route, **kwargs)
+            finally:
+                self.release(cls)
+        return scheduled
+
+    # ===== admission
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._refilled) * self.rate, float(self.max_in_flight))
+        self._refilled = now
+
+    def _may_start(self, cls: int) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        if cls in self.caps and self._in_flight[cls] >= self.caps[cls]:
+            return False
+        return True
+
+    def _start(self, cls: int) -> None:
+        self._tokens -= 1
+        self._in_flight[cls] += 1
+
+    async def acquire(self, cls: int) -> None:
+        self._refill()
+        if self._tokens >= 1 and self._may_start(cls) and not any(self._waiting.values()):
+            self._start(cls)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[cls].append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(cls)  # we were admitted right as we got cancelled
+            else:
+                self._waiting[cls].remove(future)
+            raise
+
+    def release(self, cls: int) -> None:
+        self._in_flight[cls] -= 1
+        self._dispatch()
+
+    def _next_class(self):
+        ready = [cls for cls in sorted(self._waiting) if self._waiting[cls] and self._may_start(cls)]
+        if not ready:
+            return None
+        if not any(self._credits[cls] > 0 for cls in ready):
+            self._credits = dict(self.weights)
+        for cls in ready:
+            if self._credits[cls] > 0:
+                self._credits[cls] -= 1
+                return cls
+        return None
+
+    def _dispatch(self) -> None:
+        self._refill()
+        while self._tokens >= 1:
+            cls = self._next_class()
+            if cls is None:
+                return
+            future = self._waiting[cls].popleft()
+            if future.done():
+                continue
+            self._start(cls)
+            future.set_result(None)
+        # out of tokens with requests waiting: come back when the next one is available
+        if any(self._waiting.values()) and (self._wakeup is None or self._wakeup.cancelled() or self._wakeup.when() <= asyncio.get_running_loop().time()):
+            delay = (1 - self._tokens) / self.rate
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
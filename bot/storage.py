@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Sequence, Tuple
+
+_STOP = object()
+# futures resolved per loop iteration, so a big batch doesn't wake every waiting task at once
+RESOLVE_SLICE = 64
+
+
+class _Write:
+    __slots__ = ("sql", "params", "many", "script", "future", "loop")
+
+    def __init__(self, sql, params, many, script, future, loop):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.script = script
+        self.future = future
+        self.loop = loop
+
+
+def _resolve(future: asyncio.Future, result=None, exc: Optional[BaseException] = None):
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+def _resolve_slice(loop: asyncio.AbstractEventLoop, results: List[Tuple[asyncio.Future, Any, Optional[BaseException]]]) -> None:
+    for future, result, exc in results[:RESOLVE_SLICE]:
+        _resolve(future, result, exc)
+    if len(results) > RESOLVE_SLICE:
+        loop.call_soon(_resolve_slice, loop, results[RESOLVE_SLICE:])
+
+
+class Storage:
+    '''
+    Async front end for the SQLite database.
+
+    All queries run off the event loop: writes go through a single writer thread
+    that groups whatever is queued into one transaction (one commit/fsync per batch),
+    and reads are served by a small pool of reader threads, each holding its own
+    connection. The database runs in WAL mode so readers never block the writer.
+    '''
+
+    def __init__(self, path: str = "judging.db", readers: int = 4, max_batch: int = 256) -> None:
+        self.path = path
+        self.max_batch = max_batch
+        self._writes: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="sqlite-reader")
+        self._ready = threading.Event()
+        self._start_error: Optional[BaseException] = None
+        self.started = False
+        # called as observe(kind, seconds) after each query, if set (see bot/metrics.py)
+        self.observe: Optional[Callable[[str, float], None]] = None
+
+    # ===== lifecycle
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are managed explicitly by the writer
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    async def start(self) -> None:
+        '''Starts the writer thread and switches the database to WAL mode. Safe to call more than once.'''
+        if self.started:
+            return
+        self.started = True
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+        await asyncio.get_running_loop().run_in_executor(None, self._ready.wait)
+        if self._start_error is not None:
+            raise self._start_error
+
+    async def close(self) -> None:
+        '''Flushes pending writes and closes every connection.'''
+        if not self.started:
+            return
+        self._writes.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self._writer.join)
+        self._pool.shutdown(wait=True)
+        with self._reader_lock:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+        self.started = False
+
+    # ===== writer thread
+
+    def _write_loop(self) -> None:
+        try:
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        except BaseException as e:
+            self._start_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        stop = False
+        while not stop:
+            batch = [self._writes.get()]
+            # group everything that is already waiting into the same commit
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [w for w in batch if w is not _STOP]
+            group = []
+            for write in batch:
+                if write.script:
+                    # executescript commits on its own, so it can't share a transaction
+                    self._run_batch(conn, group)
+                    group = []
+                    self._run_script(conn, write)
+                else:
+                    group.append(write)
+            self._run_batch(conn, group)
+        conn.close()
+
+    def _run_script(self, conn: sqlite3.Connection, write: _Write) -> None:
+        try:
+            conn.executescript(write.sql)
+        except Exception as e:
+            write.loop.call_soon_threadsafe(_resolve, write.future, None, e)
+        else:
+            write.loop.call_soon_threadsafe(_resolve, write.future, None, None)
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[_Write]) -> None:
+        if not batch:
+            return
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                # hand the GIL over between statements; otherwise the event loop thread can
+                # wait out a whole switch interval (5ms) for it while a big batch runs
+                time.sleep(0)
+                # a savepoint per statement so one bad write doesn't sink the whole batch
+                conn.execute("SAVEPOINT w")
+                try:
+                    if write.many:
+                        cur = conn.executemany(write.sql, write.params)
+                        results.append((write, cur.rowcount, None))
+                    else:
+                        cur = conn.execute(write.sql, write.params)
+                        results.append((write, cur.rowcount, None))
+                    conn.execute("RELEASE w")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO w")
+                    conn.execute("RELEASE w")
+                    results.append((write, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logging.exception("storage: write batch failed")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(write, None, e) for write in batch]
+
+        # one wakeup per loop rather than one per write
+        by_loop = {}
+        for write, result, exc in results:
+            by_loop.setdefault(write.loop, []).append((write.future, result, exc))
+        for loop, resolved in by_loop.items():
+            loop.call_soon_threadsafe(_resolve_slice, loop, resolved)
+
+    # ===== reader pool
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._reader_lock:
+                self._reader_conns.append(conn)
+        return conn
+
+    def _fetchall(self, sql: str, params: Sequence[Any]) -> List[Tuple]:
+        return self._reader().execute(sql, params).fetchall()
+
+    def _fetchone(self, sql: str, params: Sequence[Any]) -> Optional[Tuple]:
+        return self._reader().execute(sql, params).fetchone()
+
+    def _fetchmany(self, cursor: sqlite3.Cursor, size: int) -> List[Tuple]:
+        return cursor.fetchmany(size)
+
+    def _open_cursor(self, sql: str, params: Sequence[Any]) -> sqlite3.Cursor:
+        # iteration gets a private connection so a long scan doesn't pin a pooled one
+        conn = self._connect()
+        return conn.execute(sql, params)
+
+    def _close_cursor(self, cursor: sqlite3.Cursor) -> None:
+        conn = cursor.connection
+        cursor.close()
+        conn.close()
+
+    # ===== public API
+
+    async def _timed(self, kind: str, awaitable):
+        if self.observe is None:
+            return await awaitable
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.observe(kind, time.perf_counter() - start)
+
+    def _submit(self, sql: str, params: Any = (), many: bool = False, script: bool = False) -> asyncio.Future:
+        self._check_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._writes.put(_Write(sql, params, many, script, future, loop))
+        return future
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        '''Runs a write statement and waits for its batch to commit. Returns the row count.'''
+        return await self._timed("write", self._submit(sql, params))
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        '''Runs a write statement once per parameter set, inside a single commit.'''
+        return await self._timed("write", self._submit(sql, list(seq_of_params), many=True))
+
+    async def executescript(self, sql: str) -> None:
+        '''Runs a multi-statement script (schema setup) on the writer.'''
+        await self._timed("script", self._submit(sql, script=True))
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        self._check_started()
+        return await self._timed("read", asyncio.get_running_loop().run_in_executor(self._pool, self._fetchall, sql, params))
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Tuple]:
+        self._check_started()
+        return await self._timed("read", asyncio.get_running_loop().run_in_executor(self._pool, self._fetchone, sql, params))
+
+    async def iterate(self, sql: str, params: Sequence[Any] = (), size: int = 100) -> AsyncIterator[Tuple]:
+        '''Streams rows `size` at a time instead of materializing the whole result.'''
+        self._check_started()
+        loop = asyncio.get_running_loop()
+        cursor = await loop.run_in_executor(self._pool, self._open_cursor, sql, params)
+        try:
+            while True:
+                rows = await loop.run_in_executor(self._pool, self._fetchmany, cursor, size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await loop.run_in_executor(self._pool, self._close_cursor, cursor)
+
+    def _check_started(self) -> None:
+        if not self.started:
+            raise RuntimeError("Storage.start() has not been awaited")
+
+    @property
+    def pending_writes(self) -> int:
+        return self._writes.qsize()
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from discord import app_commands
+
+from .storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+async def get_state(db: Storage, key: str) -> Optional[str]:
+    row = await db.fetchone("SELECT value FROM bot_state WHERE key = ?", (key,))
+    return row[0] if row else None
+
+
+async def set_state(db: Storage, key: str, value: str) -> None:
+    await db.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def tree_hash(tree: app_commands.CommandTree) -> str:
+    '''A stable hash of the global command payload that `tree.sync()` would upload.'''
+    payload = [command.to_dict(tree) for command in tree.get_commands()]
+    payload.sort(key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, db: Storage, application_id: int) -> Optional[int]:
+    '''
+    Syncs the global command tree only if it differs from the last successful sync.
+    Returns the number of synced commands, or None if the sync was skipped.
+    '''
+    key = f"tree_hash:{application_id}"
+    current = tree_hash(tree)
+    if await get_state(db, key) == current:
+        logging.info("sync: command tree unchanged, skipping sync")
+        return None
+
+    synced = await tree.sync()
+    await set_state(db, key, current)
+    return len(synced)
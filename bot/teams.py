@@ -0,0 +1,205 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+from .storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    guild_id INTEGER NOT NULL,
+    team_name TEXT NOT NULL,
+    role_id INTEGER,
+    category_id INTEGER,
+    text_channel_id INTEGER,
+    voice_channel_id INTEGER,
+    PRIMARY KEY (guild_id, team_name)
+);
+CREATE TABLE IF NOT EXISTS team_members (
+    guild_id INTEGER NOT NULL,
+    member_id INTEGER NOT NULL,
+    team_name TEXT NOT NULL,
+    PRIMARY KEY (guild_id, member_id)
+);
+"""
+
+
+class Team:
+    __slots__ = ("guild_id", "name", "role_id", "category_id", "text_channel_id", "voice_channel_id", "member_ids")
+
+    def __init__(self, guild_id: int, name: str, role_id=None, category_id=None, text_channel_id=None, voice_channel_id=None) -> None:
+        self.guild_id = guild_id
+        self.name = name
+        self.role_id = role_id
+        self.category_id = category_id
+        self.text_channel_id = text_channel_id
+        self.voice_channel_id = voice_channel_id
+        self.member_ids: Set[int] = set()
+
+    def mentions(self) -> str:
+        return " ".join(f"<@{member_id}>" for member_id in sorted(self.member_ids))
+
+
+class TeamRegistry:
+    '''
+    The `teams` / `team_members` tables, mirrored in memory so lookups never hit the database:
+
+    - (guild, member id) -> team
+    - (guild, team name) -> team (and its member ids)
+    - channel id -> team, for any of the team's category/text/voice channels
+
+    A team being provisioned holds its name and members with `reserve` until it's added
+    (or given up), so two creations can't both claim them.
+    '''
+
+    def __init__(self, db: Storage) -> None:
+        self.db = db
+        self._teams: Dict[Tuple[int, str], Team] = {}
+        self._by_member: Dict[Tuple[int, int], Team] = {}
+        self._by_channel: Dict[int, Team] = {}
+        self._reserved: Dict[Tuple[int, str], Set[int]] = {}  # (guild, team name) -> member ids, while provisioning
+
+    def __len__(self) -> int:
+        return len(self._teams)
+
+    async def load(self) -> None:
+        '''Creates the tables if needed and loads every team into memory.'''
+        await self.db.executescript(SCHEMA)
+        self._teams.clear()
+        self._by_member.clear()
+        self._by_channel.clear()
+
+        for row in await self.db.fetchall(
+            "SELECT guild_id, team_name, role_id, category_id, text_channel_id, voice_channel_id FROM teams"
+        ):
+            self._index(Team(*row))
+        for guild_id, member_id, team_name in await self.db.fetchall(
+            "SELECT guild_id, member_id, team_name FROM team_members"
+        ):
+            team = self._teams.get((guild_id, team_name))
+            if team is None:
+                logging.warning(f"teams: member {member_id} points at unknown team {team_name}")
+                continue
+            team.member_ids.add(member_id)
+            self._by_member[(guild_id, member_id)] = team
+        logging.info(f"teams: loaded {len(self._teams)} teams")
+
+    def _index(self, team: Team) -> None:
+        self._teams[(team.guild_id, team.name)] = team
+        for channel_id in (team.category_id, team.text_channel_id, team.voice_channel_id):
+            if channel_id is not None:
+                self._by_channel[channel_id] = team
+
+    # ===== lookups
+
+    def get(self, guild_id: int, team_name: str) -> Optional[Team]:
+        return self._teams.get((guild_id, team_name))
+
+    def team_of(self, guild_id: int, member_id: int) -> Optional[Team]:
+        return self._by_member.get((guild_id, member_id))
+
+    def for_channel(self, channel: discord.abc.GuildChannel) -> Optional[Team]:
+        '''The team owning `channel`, falling back to its name for teams registered without channel ids.'''
+        team = self._by_channel.get(channel.id)
+        if team is None:
+            team = self._teams.get((channel.guild.id, channel.name))
+        return team
+
+    def teams(self, guild_id: int) -> List[Team]:
+        return [team for (g, _), team in self._teams.items() if g == guild_id]
+
+    # ===== updates
+
+    def reserve(self, guild_id: int, team_name: str, member_ids: Iterable[int]) -> bool:
+        '''Holds a name and members for a team about to be provisioned. Returns False if any is taken or held.'''
+        member_ids = set(member_ids)
+        if (guild_id, team_name) in self._teams or (guild_id, team_name) in self._reserved:
+            return False
+        held = {member_id for (g, _), ids in self._reserved.items() if g == guild_id for member_id in ids}
+        if member_ids & held or any((guild_id, member_id) in self._by_member for member_id in member_ids):
+            return False
+        self._reserved[(guild_id, team_name)] = member_ids
+        return True
+
+    def release(self, guild_id: int, team_name: str) -> None:
+        self._reserved.pop((guild_id, team_name), None)
+
+    async def add(
+        self,
+        guild_id: int,
+        team_name: str,
+        member_ids: Iterable[int],
+        role_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        text_channel_id: Optional[int] = None,
+        voice_channel_id: Optional[int] = None,
+    ) -> Team:
+        '''Registers (or replaces) a team and its members. Raises ValueError if a member is on another team.'''
+        member_ids = set(member_ids)
+        taken = [member_id for member_id in member_ids if self._by_member.get((guild_id, member_id), None) not in (None, self.get(guild_id, team_name))]
+        if taken:
+            raise ValueError(f"already on another team: {', '.join(f'<@{member_id}>' for member_id in taken)}")
+        await self.remove(guild_id, team_name)
+
+        await self.db.execute(
+            "INSERT OR REPLACE INTO teams (guild_id, team_name, role_id, category_id, text_channel_id, voice_channel_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (guild_id, team_name, role_id, category_id, text_channel_id, voice_channel_id),
+        )
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO team_members (guild_id, member_id, team_name) VALUES (?, ?, ?)",
+            [(guild_id, member_id, team_name) for member_id in member_ids],
+        )
+
+        team = Team(guild_id, team_name, role_id, category_id, text_channel_id, voice_channel_id)
+        self._index(team)
+        for member_id in member_ids:
+            team.member_ids.add(member_id)
+            self._by_member[(guild_id, member_id)] = team
+        return team
+
+    async def remove(self, guild_id: int, team_name: str) -> None:
+        team = self._teams.pop((guild_id, team_name), None)
+        if team is None:
+            return
+        for member_id in team.member_ids:
+            if self._by_member.get((guild_id, member_id)) is team:
+                del self._by_member[(guild_id, member_id)]
+        for channel_id in (team.category_id, team.text_channel_id, team.voice_channel_id):
+            if self._by_channel.get(channel_id) is team:
+                del self._by_channel[channel_id]
+        await self.db.execute("DELETE FROM team_members WHERE guild_id = ? AND team_name = ?", (guild_id, team_name))
+        await self.db.execute("DELETE FROM teams WHERE guild_id = ? AND team_name = ?", (guild_id, team_name))
+
+    async def import_guild(self, guild: discord.Guild, exclude: Iterable[str] = ()) -> int:
+        '''
+        One-off import of teams created before the registry existed: every category with a
+        same-named role and a same-named text channel inside it is taken to be a team, and
+        that role's holders its members. Names in `exclude` (the staff, mod and participant
+        roles) are never teams. Returns how many teams were added.
+        '''
+        exclude = set(exclude)
+        roles = {role.name: role for role in guild.roles}
+        added = 0
+        for category in guild.categories:
+            role = roles.get(category.name)
+            if role is None or category.name in exclude or self.get(guild.id, category.name) is not None:
+                continue
+            text = discord.utils.get(category.text_channels, name=category.name)
+            if text is None:
+                continue  # a staff area that happens to share a role's name, not a team
+            voice = discord.utils.get(category.voice_channels, name=category.name)
+            member_ids = []
+            for member in role.members:
+                if self.team_of(guild.id, member.id) is not None:
+                    logging.warning(f"teams: {member} holds the {category.name} role but is already on {self.team_of(guild.id, member.id).name}; not adding them")
+                    continue
+                member_ids.append(member.id)
+            await self.add(
+                guild.id, category.name, member_ids,
+                role_id=role.id,
+                category_id=category.id,
+                text_channel_id=text.id,
+                voice_channel_id=voice.id if voice else None,
+            )
+            added += 1
+        return added
@@ -1,7 +1,70 @@
 import discord
 import asyncio
+from typing import Dict, Optional, Tuple
 from discord.ext import commands
 
+CONFIRM_EMOJI = ["✅", "❌"]
+ALREADY_ACKNOWLEDGED = 40060  # Discord error code for a second response to an interaction
+
+
+async def respond(interaction: discord.Interaction, content: str = None, **kwargs) -> Optional[discord.WebhookMessage]:
+    '''
+    Replies to an interaction, whether or not it has been deferred.
+
+    Sends the initial response if nothing has been sent yet, otherwise a follow-up. Returns the
+    follow-up message, or None when the initial response was used (see `original_response`).
+    '''
+    if not interaction.response.is_done():
+        try:
+            await interaction.response.send_message(content, **kwargs)
+            return None
+        except discord.InteractionResponded:
+            pass
+        except discord.HTTPException as e:
+            # lost a race with the auto-defer
+            if e.code != ALREADY_ACKNOWLEDGED:
+                raise
+    return await interaction.followup.send(content, wait=True, **kwargs)
+
+
+class ConfirmationRegistry:
+    '''
+    Pending confirmations keyed by message id.
+
+    Raw reaction events are dispatched with a single dict lookup, so the cost per
+    reaction doesn't grow with the number of confirmations waiting at once.
+    '''
+
+    def __init__(self) -> None:
+        self._pending: Dict[int, Tuple[int, asyncio.Future]] = {}  # message id -> (user id, future)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def register(self, message_id: int, user_id: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = (user_id, future)
+        return future
+
+    def discard(self, message_id: int) -> None:
+        entry = self._pending.pop(message_id, None)
+        if entry is not None and not entry[1].done():
+            entry[1].cancel()
+
+    def dispatch(self, payload: discord.RawReactionActionEvent) -> bool:
+        '''Resolves the confirmation `payload` answers, if any. Returns True if the event was consumed.'''
+        entry = self._pending.get(payload.message_id)
+        if entry is None:
+            return False
+        user_id, future = entry
+        emoji = str(payload.emoji)
+        if payload.user_id != user_id or emoji not in CONFIRM_EMOJI:
+            return True
+        if not future.done():
+            future.set_result(emoji == "✅")
+        return True
+
+
 async def get_confirmation(bot: commands.Bot, confirm_user: discord.User, confirm_msg: discord.Message):
     '''
     Waits for `confirm_user` to react to `confirm_message`.
@@ -10,22 +73,20 @@ async def get_confirmation(bot: commands.Bot, confirm_user: discord.User, confir
     If the program times out (after 20s), it returns None.
     '''
 
-    await confirm_msg.add_reaction("✅")
-    await confirm_msg.add_reaction("❌")
-    # TODO: consider char limit
+    # register first so a fast reaction isn't missed
+    confirmation = bot.confirmations.register(confirm_msg.id, confirm_user.id)
 
-    def check(reaction, user):
-        return user == confirm_user and reaction.emoji in ["✅", "❌"]
-
-    # waiting for reaction confirmation
     try:
-        reaction, user = await bot.wait_for('reaction_add', check=check, timeout=20.0) # 20 second timeout
-    except asyncio.TimeoutError:
-        await confirm_msg.reply("Timed out waiting for confirmation; please rerun the command if you want to try again.")
-        return None
+        await confirm_msg.add_reaction("✅")
+        await confirm_msg.add_reaction("❌")
+        # TODO: consider char limit
 
-    if reaction.emoji == "✅":
-        return True
-    else:
-        return False
+        # waiting for reaction confirmation
+        try:
+            return await asyncio.wait_for(confirmation, timeout=20.0) # 20 second timeout
+        except asyncio.TimeoutError:
+            await confirm_msg.reply("Timed out waiting for confirmation; please rerun the command if you want to try again.")
+            return None
+    finally:
+        bot.confirmations.discard(confirm_msg.id)
     
\ No newline at end of file
@@ -9,6 +9,14 @@ TOKEN = os.getenv('DISCORD_TOKEN')
 # client = discord.Client(intents=discord.Intents.default())
 GUILD = os.getenv('DISCORD_GUILD')
 
-bot = Bot()
+# Sharding: SHARD_COUNT alone runs every shard in this process; add SHARD_IDS (e.g. "0,1")
+# to run only some of them, so shards can be spread over several processes
+SHARD_COUNT = int(os.getenv('SHARD_COUNT') or 0) or None
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS', '').split(',') if i.strip()] or None
+
+# LEAN_MODE: minimal intents and member cache, for large servers
+LEAN_MODE = bool(os.getenv('LEAN_MODE'))
+
+bot = Bot(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, lean=LEAN_MODE)
 
 bot.run(TOKEN)
\ No newline at end of file
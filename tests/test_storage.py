@@ -0,0 +1,75 @@
+'''
+The Storage layer must keep SQLite work off the event loop: a burst of concurrent
+submission writes, and reading them back, shouldn't hold the loop up for more than a
+few milliseconds at a time.
+'''
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import unittest
+
+from bot.storage import Storage
+
+SUBMISSIONS = 1000
+TICK = 0.001
+MAX_STALL = 0.004  # seconds a tick may wake up late
+MIN_TICKS = 20  # the ticker runs from before the burst until after the read-back
+
+
+async def ticker(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+class StorageStallTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        asyncio.get_running_loop().set_debug(False)  # the test runner's debug mode adds stalls of its own
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Storage(os.path.join(self.tmp.name, "judging.db"))
+        await self.db.start()
+        await self.db.execute("CREATE TABLE submissions (team_name TEXT PRIMARY KEY, devpost TEXT, github TEXT)")
+
+    async def asyncTearDown(self) -> None:
+        await self.db.close()
+        self.tmp.cleanup()
+
+    async def submit(self, i: int) -> None:
+        await self.db.execute(
+            "INSERT OR REPLACE INTO submissions (team_name, devpost, github) VALUES (?, ?, ?)",
+            (f"team-{i}", f"https://devpost.com/{i}", f"https://github.com/{i}"),
+        )
+
+    async def test_write_burst_does_not_stall_loop(self) -> None:
+        stop = asyncio.Event()
+        lags = []
+        tick_task = asyncio.create_task(ticker(stop, lags))
+        await asyncio.sleep(0.01)  # let the ticker settle first
+
+        # submissions arrive as separate tasks, the way concurrent commands would
+        writes = []
+        for i in range(SUBMISSIONS):
+            writes.append(asyncio.create_task(self.submit(i)))
+            if i % 50 == 49:
+                await asyncio.sleep(0)
+        await asyncio.gather(*writes)
+        rows = [row async for row in self.db.iterate("SELECT team_name, devpost, github FROM submissions")]
+        count = await self.db.fetchone("SELECT COUNT(*) FROM submissions")
+        await asyncio.sleep(0.01)  # and past the tail of the burst
+
+        stop.set()
+        await tick_task
+        self.assertEqual(count[0], SUBMISSIONS)
+        self.assertEqual(len(rows), SUBMISSIONS)
+        self.assertGreaterEqual(len(lags), MIN_TICKS)
+        self.assertLess(
+            max(lags), MAX_STALL,
+            f"event loop stalled {max(lags) * 1000:.1f} ms (median {statistics.median(lags) * 1000:.2f} ms over {len(lags)} ticks)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()